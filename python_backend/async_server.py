@@ -0,0 +1,411 @@
+"""Asyncio serving mode.
+
+    python medical_detection.py --mode async
+
+One event loop schedules every source loop, the REST API and Socket.IO
+(python-socketio's AsyncServer on aiohttp). Decode and preview encoding
+run in a sized thread pool, inference in a thread or process pool
+(INFERENCE_EXECUTOR), and Groq/VAPI calls share one aiohttp connection
+pool, so a slow LLM call never holds a source loop or an OS thread.
+"""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import aiohttp
+import cv2
+import socketio
+from aiohttp import web
+
+import config
+from frames import FrameBuffers
+from medical_detection import (FRAME_INTERVAL, SKIPPED_REASONING, MedicalEventDetector,
+                               analysis_period, detect_objects, get_model, health_status)
+from preview import BOUNDARY
+
+PENDING_REASONING = "AI analysis pending"
+
+sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+
+# Set by serve()
+detector = None
+
+
+class TaskHandle:
+    """Thread-like view of a source loop task, for the watchdog"""
+
+    def __init__(self, future):
+        self.future = future
+
+    def is_alive(self):
+        return not self.future.done()
+
+
+class AsyncMedicalEventDetector(MedicalEventDetector):
+    def __init__(self, loop):
+        self.loop = loop
+        super().__init__(emit=self.schedule_emit, alert=self.schedule_alert)
+        self.session = None
+        self.decode_pool = ThreadPoolExecutor(max_workers=config.DECODE_WORKERS,
+                                              thread_name_prefix='decode')
+        if config.INFERENCE_EXECUTOR == 'process':
+            self.inference_pool = ProcessPoolExecutor(max_workers=config.INFERENCE_WORKERS)
+        else:
+            self.inference_pool = ThreadPoolExecutor(max_workers=config.INFERENCE_WORKERS,
+                                                     thread_name_prefix='inference')
+
+    async def start(self):
+        # One connection pool for every Groq and VAPI call
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=config.HTTP_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=10))
+
+    async def close(self):
+        await self.session.close()
+        self.decode_pool.shutdown(wait=False)
+        self.inference_pool.shutdown(wait=False)
+
+    def run_soon(self, coro):
+        """Schedule a coroutine on the event loop from any thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            return self.loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def schedule_emit(self, event, payload):
+        self.run_soon(sio.emit(event, payload))
+
+    def schedule_alert(self, event_summary):
+        self.run_soon(self.trigger_voice_alert_async(event_summary))
+
+    def start_source_loop(self, source_id):
+        """Start (or restart) the source loop as a task on the event loop"""
+        generation = self.loop_generations.get(source_id, 0) + 1
+        self.loop_generations[source_id] = generation
+        self.watchdog.loop_started(source_id)
+        future = self.run_soon(self.source_loop(source_id, generation))
+        self.detection_threads[source_id] = TaskHandle(future)
+
+    async def source_loop(self, source_id, generation):
+        """Async counterpart of detect_events"""
+        video_path = self.video_sources[source_id]
+        profile = self.profiles[source_id]
+        cap = await self.loop.run_in_executor(self.decode_pool, cv2.VideoCapture, video_path)
+
+        if not cap.isOpened():
+            # The watchdog notices the finished task and retries with backoff
+            print(f"Error: Could not open video {video_path}")
+            return
+
+        buffers = FrameBuffers(profile.analysis_size)
+        self.frame_buffers[source_id] = buffers
+
+        frame_count = 0
+        last_analysis_time = 0
+        # Measured seconds per frame (decode plus pacing), outside analyses
+        frame_seconds = FRAME_INTERVAL
+
+        print(f"Starting async detection loop for {source_id}")
+
+        try:
+            while self.loop_generations.get(source_id) == generation:
+                started = self.loop.time()
+                analyzed = False
+                self.watchdog.heartbeat(source_id)
+
+                ret, frame = await self.loop.run_in_executor(self.decode_pool, buffers.read, cap)
+                if not ret:
+                    await self.loop.run_in_executor(
+                        self.decode_pool, cap.set, cv2.CAP_PROP_POS_FRAMES, 0)  # Loop video
+                    continue
+
+                frame_count += 1
+
+                stream = self.previews.get(source_id)
+                if stream is not None and stream.viewers:
+                    await self.loop.run_in_executor(
+                        self.decode_pool, stream.publish, frame,
+                        self.latest_detections.get(source_id), self.current_risk_level(source_id),
+                        buffers.source_shape)
+
+                factor = self.watchdog.cadence_factor(source_id)
+                self.watchdog.expect_analysis(
+                    source_id, analysis_period(profile, factor, frame_seconds))
+                if frame_count % (profile.analysis_interval * factor) == 0:
+                    current_time = time.time()
+                    if current_time - last_analysis_time > profile.min_analysis_seconds * factor:
+                        self.watchdog.analysis_started(source_id)
+                        await self.analyze_frame_async(source_id, frame, current_time)
+                        last_analysis_time = current_time
+                        analyzed = True
+                        self.watchdog.analysis_done(source_id, time.time() - current_time)
+
+                await asyncio.sleep(max(0.0, FRAME_INTERVAL - (self.loop.time() - started)))
+                if not analyzed:
+                    frame_seconds = 0.9 * frame_seconds + 0.1 * (self.loop.time() - started)
+        finally:
+            await self.loop.run_in_executor(self.decode_pool, cap.release)
+
+    async def analyze_frame_async(self, source_id, frame, timestamp):
+        """Run inference in the executor, then the post-inference path on the loop"""
+        try:
+            pipeline = self.pipelines[source_id]
+            detections = await self.loop.run_in_executor(
+                self.inference_pool, detect_objects, frame,
+                pipeline.profile.input_size, pipeline.class_ids)
+            self.handle_inference(source_id, frame.shape, detections, timestamp)
+        except Exception as e:
+            self.watchdog.analysis_failed(source_id)
+            print(f"Error analyzing frame: {e}")
+
+    def open_incident(self, source_id, timestamp, detections, medical_events, incident):
+        event_summary = self.build_event_summary(source_id, timestamp, detections, medical_events)
+        if self.watchdog.skip_reasoning(event_summary['risk_level']):
+            self.publish_incident(event_summary, SKIPPED_REASONING, incident)
+            return
+        # Publish right away so updates and the close always follow the
+        # open; reasoning is awaited in its own task and patched in, and the
+        # voice alert (which reads it) waits for it
+        event_summary['reasoning_pending'] = True
+        self.publish_incident(event_summary, PENDING_REASONING, incident, alert=False)
+        self.run_soon(self.complete_incident_async(event_summary, medical_events, detections))
+
+    async def complete_incident_async(self, entry, medical_events, detections):
+        """Fill in a published incident's reasoning, then place its alert"""
+        source_id = entry['source_id']
+        reasoning = await self.get_groq_reasoning_async(medical_events, detections, source_id)
+        entry.update({'reasoning': reasoning, 'groq_reasoning': reasoning})
+        entry.pop('reasoning_pending', None)
+        self.emit('groq_analysis', {
+            'source_id': source_id,
+            'incident_id': entry['incident_id'],
+            'timestamp': entry['opened_at'],
+            'reasoning': reasoning
+        })
+        # Risk may have escalated while the reasoning was pending
+        if not entry['alerted'] and entry['risk_level'] in ['critical', 'high']:
+            entry['alerted'] = True
+            await self.trigger_voice_alert_async(entry)
+
+    async def get_groq_reasoning_async(self, medical_events, detections, source_id):
+        """Get detailed reasoning from Groq LLM without blocking the loop"""
+        try:
+            headers, data = self.build_reasoning_request(medical_events, detections, source_id)
+            async with self.session.post(config.GROQ_API_URL, headers=headers, json=data) as response:
+                result = await response.json() if response.status == 200 else None
+                return self.parse_reasoning_response(response.status, result)
+        except Exception as e:
+            return f"Error in reasoning analysis: {str(e)}"
+
+    async def trigger_voice_alert_async(self, event_summary):
+        """Trigger voice alert using VAPI without blocking the loop"""
+        try:
+            alert_message = self.build_alert_message(event_summary)
+            print(f"VOICE ALERT: {alert_message}")
+            async with self.session.post(
+                config.VAPI_API_URL,
+                headers={
+                    'Authorization': f'Bearer {config.VAPI_API_KEY}',
+                    'Content-Type': 'application/json'
+                },
+                json={'message': alert_message}
+            ) as response:
+                if response.status >= 400:
+                    print(f"VAPI call failed: {response.status} {await response.text()}")
+                else:
+                    print("VAPI call succeeded")
+        except Exception as e:
+            print(f"Error calling VAPI: {e}")
+
+
+# Socket.IO event handlers
+@sio.event
+async def connect(sid, environ):
+    print('Client connected')
+    await sio.emit('connected', {'status': 'connected'}, to=sid)
+
+
+@sio.event
+async def disconnect(sid):
+    print('Client disconnected')
+
+
+@sio.on('add_video')
+async def handle_add_video(sid, data):
+    """Handle adding video sources from frontend"""
+    source_id = data.get('source_id')
+    video_path = data.get('video_path')
+    if not source_id or not video_path:
+        await sio.emit('video_added', {
+            'status': 'error',
+            'message': 'Missing source_id or video_path'
+        }, to=sid)
+        return
+    if detector.add_video_source(source_id, video_path, data.get('profile')):
+        await sio.emit('video_added', {
+            'source_id': source_id,
+            'status': 'success',
+            'message': f'Started monitoring {source_id}'
+        }, to=sid)
+    else:
+        await sio.emit('video_added', {
+            'source_id': source_id,
+            'status': 'error',
+            'message': f'Failed to add video source {source_id}'
+        }, to=sid)
+
+
+@sio.on('get_events')
+async def handle_get_events(sid, data):
+    """Handle requests for event history"""
+    source_id = data.get('source_id')
+    await sio.emit('events_history', {
+        'source_id': source_id,
+        'events': detector.event_history.get(source_id, [])
+    }, to=sid)
+
+
+# REST API
+async def add_video(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    source_id = data.get('source_id')
+    video_path = data.get('video_path')
+    if not source_id or not video_path:
+        return web.json_response({'error': 'Missing source_id or video_path'}, status=400)
+    if detector.add_video_source(source_id, video_path, data.get('profile')):
+        return web.json_response({
+            'status': 'success',
+            'message': f'Started monitoring {source_id}',
+            'source_id': source_id
+        })
+    return web.json_response({
+        'status': 'error',
+        'message': f'Failed to add video source {source_id}'
+    }, status=400)
+
+
+async def get_events(request):
+    source_id = request.match_info['source_id']
+    return web.json_response({
+        'source_id': source_id,
+        'events': detector.event_history.get(source_id, [])
+    })
+
+
+async def get_profile(request):
+    source_id = request.match_info['source_id']
+    profile = detector.profiles.get(source_id)
+    if profile is None:
+        return web.json_response({'error': f'Unknown source {source_id}'}, status=404)
+    return web.json_response({'source_id': source_id, 'profile': profile.to_dict()})
+
+
+async def start_recording(request):
+    source_id = request.match_info['source_id']
+    if source_id not in detector.video_sources:
+        return web.json_response({'error': f'Unknown source {source_id}'}, status=404)
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    try:
+        path = detector.start_recording(source_id, (data or {}).get('path'))
+        return web.json_response({'status': 'recording', 'source_id': source_id, 'path': path})
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def stop_recording(request):
+    source_id = request.match_info['source_id']
+    frames = detector.stop_recording(source_id)
+    return web.json_response({'status': 'stopped', 'source_id': source_id, 'frames': frames})
+
+
+async def preview(request):
+    """Annotated MJPEG preview; each client skips to the newest frame"""
+    source_id = request.match_info['source_id']
+    stream = detector.previews.get(source_id)
+    if stream is None:
+        return web.json_response({'error': 'Unknown source'}, status=404)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+    })
+    await response.prepare(request)
+    stream.attach()
+    try:
+        seen = 0
+        # Ends once the source is removed (or re-added with a new stream)
+        while not stream.closed and detector.previews.get(source_id) is stream:
+            if stream.sequence != seen and stream.jpeg is not None:
+                seen = stream.sequence
+                await response.write(stream.part(stream.jpeg))
+            await asyncio.sleep(stream.interval / 2)
+    except ConnectionResetError:
+        pass
+    finally:
+        stream.detach()
+    return response
+
+
+async def health_check(request):
+    return web.json_response(health_status(detector))
+
+
+async def trigger_call(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    await detector.trigger_voice_alert_async({
+        'risk_level': data.get('risk_level', 'high'),
+        'reasoning': data.get('message', 'Medical emergency reported. Please respond.')
+    })
+    return web.json_response({'status': 'ok'})
+
+
+def create_app():
+    app = web.Application()
+    sio.attach(app)
+    app.router.add_post('/api/add_video', add_video)
+    app.router.add_get('/api/events/{source_id}', get_events)
+    app.router.add_get('/api/profiles/{source_id}', get_profile)
+    app.router.add_post('/api/recordings/{source_id}', start_recording)
+    app.router.add_delete('/api/recordings/{source_id}', stop_recording)
+    app.router.add_get('/api/preview/{source_id}', preview)
+    app.router.add_get('/api/health', health_check)
+    app.router.add_post('/api/trigger_call', trigger_call)
+    return app
+
+
+async def serve(port):
+    global detector
+    loop = asyncio.get_running_loop()
+    detector = AsyncMedicalEventDetector(loop)
+    await detector.start()
+
+    # Load the model off the loop; profiles need its class names
+    await loop.run_in_executor(None, get_model)
+    detector.watchdog.start()
+
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    print(f"⚡ Async server: http://localhost:{port} "
+          f"(decode workers: {config.DECODE_WORKERS}, "
+          f"inference: {config.INFERENCE_WORKERS} {config.INFERENCE_EXECUTOR})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await detector.close()
+
+
+def run(port):
+    asyncio.run(serve(port))
@@ -0,0 +1,183 @@
+"""Minimal topic pub/sub broker and client used between cluster nodes.
+
+A stand-in for a real message broker so a coordinator, several detection
+workers and several front-end nodes can run on one machine. Messages are
+newline-delimited JSON over TCP; the broker stamps each published message
+with a global sequence number and forwards it to every subscriber of its
+topic, so all subscribers see one total order. Each subscriber has its own
+send queue and writer thread, so a stalled subscriber never holds up
+publishers; one that falls SEND_QUEUE_SIZE messages behind is disconnected.
+
+    python bus.py --port 5070
+"""
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import threading
+
+SEND_QUEUE_SIZE = 10000
+
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.queue = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.writer = threading.Thread(target=self.write_loop)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def send(self, message):
+        """Queue a message for this subscriber; False if its queue is full"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            return False
+        return True
+
+    def disconnect(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def write_loop(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            try:
+                self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            except (ConnectionError, OSError, ValueError):
+                self.server.unsubscribe(self)
+                self.disconnect()
+                return
+
+    def handle(self):
+        broker = self.server
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if message.get('op') == 'sub':
+                    broker.subscribe(self, message.get('topics', []))
+                elif message.get('op') == 'pub':
+                    broker.publish(message['topic'], message.get('data'))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            broker.unsubscribe(self)
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+
+class Broker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=5070):
+        super().__init__((host, port), BrokerHandler)
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.sequence = 0
+
+    def subscribe(self, handler, topics):
+        with self.lock:
+            for topic in topics:
+                self.subscribers.setdefault(topic, set()).add(handler)
+
+    def unsubscribe(self, handler):
+        with self.lock:
+            for handlers in self.subscribers.values():
+                handlers.discard(handler)
+
+    def publish(self, topic, data):
+        # Sequence and enqueue under one lock so every subscriber sees the
+        # same order; the writes happen on each subscriber's writer thread
+        with self.lock:
+            self.sequence += 1
+            message = {'topic': topic, 'seq': self.sequence, 'data': data}
+            for handler in list(self.subscribers.get(topic, ())):
+                if not handler.send(message):
+                    # Too far behind to catch up; drop the connection
+                    for handlers in self.subscribers.values():
+                        handlers.discard(handler)
+                    handler.disconnect()
+
+
+def parse_bus_url(url):
+    """Split 'tcp://host:port' into (host, port)"""
+    address = url.split('://', 1)[-1]
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class BusClient:
+    """Connection to the broker; callbacks run on the client's reader thread"""
+
+    def __init__(self, url):
+        self.host, self.port = parse_bus_url(url)
+        self.sock = socket.create_connection((self.host, self.port))
+        self.reader = self.sock.makefile('rb')
+        self.write_lock = threading.Lock()
+        self.callbacks = {}
+        self.thread = threading.Thread(target=self.read_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, message):
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self.write_lock:
+            self.sock.sendall(data)
+
+    def publish(self, topic, data):
+        self.send({'op': 'pub', 'topic': topic, 'data': data})
+
+    def subscribe(self, topic, callback, with_seq=False):
+        """Call `callback(data)`, or `callback(data, seq)` with `with_seq`"""
+        self.callbacks.setdefault(topic, []).append((callback, with_seq))
+        self.send({'op': 'sub', 'topics': [topic]})
+
+    def read_loop(self):
+        try:
+            for line in self.reader:
+                message = json.loads(line)
+                for callback, with_seq in self.callbacks.get(message['topic'], []):
+                    try:
+                        if with_seq:
+                            callback(message['data'], message['seq'])
+                        else:
+                            callback(message['data'])
+                    except Exception as e:
+                        print(f"Error handling bus message on {message['topic']}: {e}")
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"Bus connection lost: {e}")
+
+    def close(self):
+        try:
+            # Shut down first; the reader's file object keeps the fd open
+            self.sock.shutdown(socket.SHUT_RDWR)
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local pub/sub broker for cluster mode')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5070)
+    args = parser.parse_args()
+
+    broker = Broker(args.host, args.port)
+    print(f"📨 Bus broker: tcp://{args.host}:{args.port}")
+    broker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""Coordinator, worker and front-end roles for multi-node deployments.
+
+    python bus.py                                        # broker stand-in
+    python medical_detection.py --mode coordinator       # assigns sources, serves UI
+    python medical_detection.py --mode worker --node-id w1
+    python medical_detection.py --mode worker --node-id w2
+    python medical_detection.py --mode frontend --port 5002
+
+Workers run detection for the sources assigned to them and publish every
+Socket.IO emit on the bus; coordinator and front-end nodes relay those to
+their own clients and rebuild event history from the same ordered stream.
+Front-end nodes forward new sources to the coordinator. Voice alerts are
+requested over the bus and placed only by the coordinator, which
+deduplicates them across nodes.
+"""
+import threading
+import time
+import uuid
+
+import config
+
+TOPIC_HEARTBEAT = 'node.heartbeat'
+TOPIC_LEAVE = 'node.leave'
+TOPIC_ASSIGN = 'cluster.assign'
+TOPIC_EMIT = 'cluster.emit'
+TOPIC_ALERT = 'alert.request'
+TOPIC_HISTORY_REQUEST = 'history.request'
+TOPIC_HISTORY_SNAPSHOT = 'history.snapshot'
+TOPIC_SOURCE_ADD = 'source.add'
+
+
+def apply_to_history(event_history, event, payload):
+    """Fold one relayed emit into an event history dict"""
+    source_id = payload.get('source_id')
+    if event == 'medical_event':
+        events = event_history.setdefault(source_id, [])
+        events.append(payload)
+        if len(events) > 10:  # Keep last 10 incidents
+            events.pop(0)
+    elif event in ('incident_update', 'incident_closed'):
+        for entry in reversed(event_history.get(source_id, [])):
+            if entry.get('incident_id') == payload.get('incident_id'):
+                if event == 'incident_update':
+                    for key in ('timestamp', 'risk_level', 'confidence', 'event_description'):
+                        entry[key] = payload[key]
+                else:
+                    entry['incident_state'] = 'closed'
+                    entry['closed_at'] = payload['timestamp']
+                break
+
+
+class FrontendRelay:
+    """Re-emits worker events to this node's Socket.IO clients"""
+
+    def __init__(self, bus, detector, emit, node_id):
+        self.bus = bus
+        self.detector = detector
+        self.emit = emit
+        self.node_id = node_id
+        self.lock = threading.Lock()
+        # Bus sequence number of the last emit folded into history
+        self.applied_seq = 0
+        # Emits received while waiting for a history snapshot, as (seq, event, payload)
+        self.pending = None
+        bus.subscribe(TOPIC_EMIT, self.handle_emit, with_seq=True)
+        bus.subscribe(TOPIC_HISTORY_SNAPSHOT, self.handle_snapshot)
+
+    def add_source(self, source_id, video_path, profile=None):
+        """Forward a new source to the coordinator, which assigns it"""
+        self.bus.publish(TOPIC_SOURCE_ADD, {
+            'node_id': self.node_id,
+            'source_id': source_id,
+            'video_path': video_path,
+            'profile': profile,
+        })
+        return True
+
+    def request_history(self):
+        # Hold history updates until the snapshot lands so it can't
+        # overwrite newer events
+        with self.lock:
+            self.pending = []
+        self.bus.publish(TOPIC_HISTORY_REQUEST, {'node_id': self.node_id})
+
+    def handle_emit(self, data, seq):
+        event, payload = data['event'], data['payload']
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((seq, event, payload))
+            else:
+                apply_to_history(self.detector.event_history, event, payload)
+                self.applied_seq = seq
+        try:
+            self.emit(event, payload)
+        except Exception as e:
+            print(f"Error relaying {event}: {e}")
+
+    def handle_snapshot(self, data):
+        if data.get('node_id') != self.node_id:
+            return
+        with self.lock:
+            history = self.detector.event_history
+            history.clear()
+            history.update(data['history'])
+            self.applied_seq = data['seq']
+            # Replay what arrived after the coordinator took the snapshot
+            for seq, event, payload in self.pending or []:
+                if seq > data['seq']:
+                    apply_to_history(history, event, payload)
+                    self.applied_seq = seq
+            self.pending = None
+
+    def status(self):
+        with self.lock:
+            return {
+                'node_id': self.node_id,
+                'history_synced': self.pending is None,
+                'applied_seq': self.applied_seq,
+            }
+
+
+class Coordinator(FrontendRelay):
+    """Tracks live workers, assigns sources to them and places voice alerts"""
+
+    def __init__(self, bus, detector, emit, node_id='coordinator'):
+        super().__init__(bus, detector, emit, node_id)
+        # Workers reset their epoch when this changes, i.e. after a restart
+        self.instance_id = uuid.uuid4().hex
+        self.nodes = {}
+        self.node_sources = {}
+        self.sources = {}
+        self.assignments = {}
+        # Nodes that failed to open a source, by source id
+        self.failures = {}
+        self.epoch = 0
+        self.alerted_incidents = {}
+        self.last_alert = {}
+        bus.subscribe(TOPIC_HEARTBEAT, self.handle_heartbeat)
+        bus.subscribe(TOPIC_LEAVE, self.handle_leave)
+        bus.subscribe(TOPIC_ALERT, self.handle_alert)
+        bus.subscribe(TOPIC_HISTORY_REQUEST, self.handle_history_request)
+        bus.subscribe(TOPIC_SOURCE_ADD, self.handle_source_add)
+
+    def add_source(self, source_id, video_path, profile=None):
+        with self.lock:
+            self.sources[source_id] = {
+                'source_id': source_id,
+                'video_path': video_path,
+                'profile': profile,
+            }
+            # Re-adding a source gives every node another try
+            self.failures.pop(source_id, None)
+            self.detector.event_history.setdefault(source_id, [])
+            self.rebalance()
+        return True
+
+    def handle_source_add(self, data):
+        print(f"Cluster: {data['node_id']} added {data['source_id']}")
+        self.add_source(data['source_id'], data['video_path'], data.get('profile'))
+
+    def handle_heartbeat(self, data):
+        node_id = data['node_id']
+        with self.lock:
+            joined = node_id not in self.nodes
+            self.nodes[node_id] = time.time()
+            self.node_sources[node_id] = set(data.get('sources', []))
+            # Workers report full source specs, so a restarted coordinator
+            # rebuilds its source table and keeps running sources in place
+            for spec in data.get('specs', []):
+                source_id = spec['source_id']
+                if source_id not in self.sources:
+                    self.sources[source_id] = spec
+                    self.detector.event_history.setdefault(source_id, [])
+                if (source_id in self.node_sources[node_id]
+                        and self.assignments.get(source_id) not in self.nodes):
+                    self.assignments[source_id] = node_id
+            failed = [sid for sid in data.get('failed', [])
+                      if self.assignments.get(sid) == node_id]
+            for source_id in failed:
+                print(f"Cluster: node {node_id} failed to open {source_id}")
+                self.failures.setdefault(source_id, set()).add(node_id)
+            if joined:
+                print(f"Cluster: node {node_id} joined")
+                self.rebalance()
+            elif failed:
+                self.rebalance()
+            elif self.node_sources[node_id] != self.assigned_to(node_id):
+                # The node missed or is still applying an assignment
+                self.publish_assignments()
+
+    def handle_leave(self, data):
+        with self.lock:
+            if self.nodes.pop(data['node_id'], None) is not None:
+                print(f"Cluster: node {data['node_id']} left")
+                self.forget_failures(data['node_id'])
+                self.rebalance()
+
+    def check_nodes(self):
+        """Drop workers whose heartbeat has expired"""
+        now = time.time()
+        with self.lock:
+            expired = [n for n, seen in self.nodes.items() if now - seen > config.NODE_TIMEOUT]
+            for node_id in expired:
+                print(f"Cluster: node {node_id} timed out")
+                del self.nodes[node_id]
+                self.forget_failures(node_id)
+            if expired:
+                self.rebalance()
+
+    def forget_failures(self, node_id):
+        """A node that rejoins gets another try at sources it failed"""
+        for source_id in list(self.failures):
+            self.failures[source_id].discard(node_id)
+            if not self.failures[source_id]:
+                del self.failures[source_id]
+
+    def assigned_to(self, node_id):
+        return {sid for sid, node in self.assignments.items() if node == node_id}
+
+    def rebalance(self):
+        """Keep sources where they are when possible, then even out the load.
+
+        A source never goes back to a node that failed to open it; when
+        every live node has failed it, it stays unassigned.
+        """
+        live = sorted(self.nodes)
+        load = {node_id: [] for node_id in live}
+        orphans = []
+        for source_id in sorted(self.sources):
+            node_id = self.assignments.get(source_id)
+            if node_id in load and node_id not in self.failures.get(source_id, ()):
+                load[node_id].append(source_id)
+            else:
+                orphans.append(source_id)
+
+        if live:
+            for source_id in orphans:
+                candidates = [n for n in live if n not in self.failures.get(source_id, ())]
+                if candidates:
+                    target = min(candidates, key=lambda n: (len(load[n]), n))
+                    load[target].append(source_id)
+            while True:
+                most = max(live, key=lambda n: (len(load[n]), n))
+                least = min(live, key=lambda n: (len(load[n]), n))
+                if len(load[most]) - len(load[least]) <= 1:
+                    break
+                movable = [sid for sid in load[most] if least not in self.failures.get(sid, ())]
+                if not movable:
+                    break
+                load[most].remove(movable[-1])
+                load[least].append(movable[-1])
+
+        self.assignments = {sid: node_id for node_id, sids in load.items() for sid in sids}
+        self.epoch += 1
+        self.publish_assignments()
+
+    def publish_assignments(self):
+        assignments = {}
+        for source_id, node_id in self.assignments.items():
+            assignments.setdefault(node_id, []).append(self.sources[source_id])
+        self.bus.publish(TOPIC_ASSIGN, {
+            'coordinator': self.instance_id,
+            'epoch': self.epoch,
+            'nodes': sorted(self.nodes),
+            'assignments': assignments,
+        })
+
+    def handle_alert(self, data):
+        """Place a voice alert unless this incident was already alerted"""
+        summary = data['event_summary']
+        source_id = summary.get('source_id')
+        incident_id = summary.get('incident_id')
+        node_id = data.get('node_id')
+        now = time.time()
+        with self.lock:
+            if incident_id and incident_id in self.alerted_incidents:
+                return
+            # A source moved between workers re-opens its incident under a
+            # new id on the new node; only that case is held to the window
+            last = self.last_alert.get(source_id)
+            if (last is not None and last[1] != node_id
+                    and now - last[0] < config.ALERT_DEDUP_SECONDS):
+                return
+            if incident_id:
+                self.alerted_incidents[incident_id] = now
+            self.last_alert[source_id] = (now, node_id)
+            cutoff = now - config.ALERT_DEDUP_SECONDS
+            for key in [k for k, t in self.alerted_incidents.items() if t < cutoff]:
+                del self.alerted_incidents[key]
+
+        thread = threading.Thread(target=self.detector.trigger_voice_alert, args=(summary,))
+        thread.daemon = True
+        thread.start()
+
+    def handle_history_request(self, data):
+        with self.lock:
+            history = {sid: [dict(e) for e in events]
+                       for sid, events in self.detector.event_history.items()}
+            seq = self.applied_seq
+        self.bus.publish(TOPIC_HISTORY_SNAPSHOT, {
+            'node_id': data['node_id'],
+            'seq': seq,
+            'history': history,
+        })
+
+    def run(self):
+        while True:
+            time.sleep(config.NODE_HEARTBEAT_INTERVAL)
+            try:
+                self.check_nodes()
+            except Exception as e:
+                print(f"Coordinator error: {e}")
+
+    def start(self):
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+
+    def status(self):
+        with self.lock:
+            return {
+                'instance_id': self.instance_id,
+                'epoch': self.epoch,
+                'nodes': {n: {'last_seen': seen, 'sources': sorted(self.assigned_to(n))}
+                          for n, seen in self.nodes.items()},
+                'unassigned': sorted(set(self.sources) - set(self.assignments)),
+                'failed': {sid: sorted(nodes) for sid, nodes in self.failures.items()},
+            }
+
+
+class Worker:
+    """Runs detection for the sources the coordinator assigns to this node"""
+
+    def __init__(self, bus, detector, node_id):
+        self.bus = bus
+        self.detector = detector
+        self.node_id = node_id
+        self.coordinator = None
+        self.epoch = 0
+        # Specs of the sources assigned to this node, reported in heartbeats
+        self.specs = {}
+        # Sources this node was assigned but could not open
+        self.failed = set()
+        self.lock = threading.Lock()
+        detector.emit = self.publish_emit
+        detector.alert = self.request_alert
+        # Incident ids must stay unique when a source moves between workers
+        detector.incidents.id_prefix = f"{node_id}-"
+        bus.subscribe(TOPIC_ASSIGN, self.handle_assign)
+
+    def publish_emit(self, event, payload):
+        self.bus.publish(TOPIC_EMIT, {'node_id': self.node_id, 'event': event, 'payload': payload})
+
+    def request_alert(self, event_summary):
+        self.bus.publish(TOPIC_ALERT, {'node_id': self.node_id, 'event_summary': event_summary})
+
+    def handle_assign(self, data):
+        with self.lock:
+            if self.node_id not in data.get('nodes', ()):
+                # The coordinator hasn't heard from this node yet (e.g. it
+                # just restarted), so its assignment says nothing about us
+                return
+            if data.get('coordinator') != self.coordinator:
+                # A restarted coordinator counts epochs from scratch
+                self.coordinator = data.get('coordinator')
+                self.epoch = 0
+            elif data['epoch'] < self.epoch:
+                return
+            self.epoch = data['epoch']
+            mine = {s['source_id']: s for s in data['assignments'].get(self.node_id, [])}
+            self.specs = mine
+            self.failed &= set(mine)
+            for source_id in list(self.detector.video_sources):
+                if source_id not in mine:
+                    print(f"Worker {self.node_id}: releasing {source_id}")
+                    self.detector.remove_video_source(source_id)
+            for source_id, source in mine.items():
+                if source_id in self.detector.video_sources or source_id in self.failed:
+                    continue
+                print(f"Worker {self.node_id}: taking {source_id}")
+                if not self.detector.add_video_source(
+                        source_id, source['video_path'], source.get('profile')):
+                    # Reported in the heartbeat so the coordinator reassigns it
+                    self.failed.add(source_id)
+
+    def heartbeat(self):
+        with self.lock:
+            failed = sorted(self.failed)
+            specs = list(self.specs.values())
+        self.bus.publish(TOPIC_HEARTBEAT, {
+            'node_id': self.node_id,
+            'sources': sorted(self.detector.video_sources),
+            'specs': specs,
+            'failed': failed,
+        })
+
+    def run_forever(self):
+        try:
+            while True:
+                self.heartbeat()
+                time.sleep(config.NODE_HEARTBEAT_INTERVAL)
+        finally:
+            self.bus.publish(TOPIC_LEAVE, {'node_id': self.node_id})
@@ -4,4 +4,42 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', 'your_groq_api_key_here')
-VAPI_API_KEY = os.getenv('VAPI_API_KEY', 'your_vapi_api_key_here') 
\ No newline at end of file
+VAPI_API_KEY = os.getenv('VAPI_API_KEY', 'your_vapi_api_key_here') 
+
+# Endpoints; point these at mock_services.py for load testing
+GROQ_API_URL = os.getenv('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+VAPI_API_URL = os.getenv('VAPI_API_URL', 'https://api.vapi.ai/trigger-call')
+
+# Where detection recordings are written (see replay.py)
+RECORDINGS_DIR = os.getenv('RECORDINGS_DIR', 'recordings')
+
+# Annotated preview stream (/api/preview/<source_id>), independent of analysis rate
+PREVIEW_FPS = float(os.getenv('PREVIEW_FPS', '5'))
+PREVIEW_WIDTH = int(os.getenv('PREVIEW_WIDTH', '640'))
+PREVIEW_JPEG_QUALITY = int(os.getenv('PREVIEW_JPEG_QUALITY', '70'))
+
+# Watchdog SLOs and load shedding (see source_watchdog.py)
+WATCHDOG_INTERVAL = float(os.getenv('WATCHDOG_INTERVAL', '2'))
+WATCHDOG_HEARTBEAT_TIMEOUT = float(os.getenv('WATCHDOG_HEARTBEAT_TIMEOUT', '10'))
+# A loop inside analyze_frame may block on inference plus Groq and VAPI
+# (10 s timeout each), so it only counts as hung after this long
+ANALYSIS_TIMEOUT = float(os.getenv('ANALYSIS_TIMEOUT', '45'))
+# A loop that stays up this long has its restart backoff reset
+WATCHDOG_HEALTHY_SECONDS = float(os.getenv('WATCHDOG_HEALTHY_SECONDS', '120'))
+ANALYSIS_LAG_SLO = float(os.getenv('ANALYSIS_LAG_SLO', '5'))
+SHED_LAGGING_FRACTION = float(os.getenv('SHED_LAGGING_FRACTION', '0.25'))
+SHED_CPU_PERCENT = float(os.getenv('SHED_CPU_PERCENT', '90'))
+SHED_CADENCE_FACTOR = int(os.getenv('SHED_CADENCE_FACTOR', '3'))
+SHED_RECOVERY_TICKS = int(os.getenv('SHED_RECOVERY_TICKS', '5'))
+
+# Multi-node deployment (see cluster.py and bus.py)
+CLUSTER_BUS_URL = os.getenv('CLUSTER_BUS_URL', 'tcp://127.0.0.1:5070')
+NODE_HEARTBEAT_INTERVAL = float(os.getenv('NODE_HEARTBEAT_INTERVAL', '2'))
+NODE_TIMEOUT = float(os.getenv('NODE_TIMEOUT', '10'))
+ALERT_DEDUP_SECONDS = float(os.getenv('ALERT_DEDUP_SECONDS', '60'))
+
+# Asyncio serving mode (see async_server.py)
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', '4'))
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '1'))
+INFERENCE_EXECUTOR = os.getenv('INFERENCE_EXECUTOR', 'thread')  # 'thread' or 'process'
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+
+class FrameBuffers:
+    """Reusable decode and analysis buffers for one source.
+
+    Frames are decoded into the same native-resolution array every time and
+    downscaled once, straight after decode, into a preallocated array whose
+    longest side is at most `analysis_size`. Everything downstream (YOLO,
+    preview) works on the analysis frame, so per-source memory is two
+    buffers no matter how long the source runs.
+    """
+
+    def __init__(self, analysis_size):
+        self.analysis_size = int(analysis_size)
+        self.decode_buffer = None
+        self.analysis_buffer = None
+        self.source_shape = None
+        self.scale = 1.0
+
+    def read(self, cap):
+        """Decode the next frame; returns (ok, analysis_frame)"""
+        ok, frame = cap.read(self.decode_buffer)
+        if not ok or frame is None:
+            return False, None
+        self.decode_buffer = frame
+
+        if frame.shape != self.source_shape:
+            self.configure(frame.shape)
+        if self.analysis_buffer is None:
+            return True, frame
+
+        cv2.resize(frame, (self.analysis_buffer.shape[1], self.analysis_buffer.shape[0]),
+                   dst=self.analysis_buffer, interpolation=cv2.INTER_AREA)
+        return True, self.analysis_buffer
+
+    def configure(self, shape):
+        """(Re)allocate the analysis buffer for a new source resolution"""
+        self.source_shape = shape
+        height, width = shape[:2]
+        longest = max(height, width)
+        if longest <= self.analysis_size:
+            self.scale = 1.0
+            self.analysis_buffer = None
+            return
+        self.scale = self.analysis_size / float(longest)
+        analysis_shape = (int(round(height * self.scale)), int(round(width * self.scale))) + shape[2:]
+        self.analysis_buffer = np.empty(analysis_shape, dtype=np.uint8)
+
+    def to_source(self, detections):
+        """Map detection boxes from analysis space back to source space (in place)"""
+        if self.scale != 1.0:
+            inverse = 1.0 / self.scale
+            for d in detections:
+                d['bbox'] = [v * inverse for v in d['bbox']]
+        return detections
+
+    def memory_usage(self):
+        """Bytes held by this source's frame buffers"""
+        decode = self.decode_buffer.nbytes if self.decode_buffer is not None else 0
+        analysis = self.analysis_buffer.nbytes if self.analysis_buffer is not None else 0
+        return {
+            'decode_buffer': decode,
+            'analysis_buffer': analysis,
+            'source_shape': list(self.source_shape) if self.source_shape else None,
+            'analysis_scale': self.scale,
+        }
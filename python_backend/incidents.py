@@ -0,0 +1,122 @@
+import itertools
+import threading
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+DEFAULT_INCIDENT_SETTINGS = {
+    # Open an incident once event confidence stays at or above `enter_confidence`
+    # for `min_dwell_seconds` (detectors already apply their own thresholds,
+    # so the default only has to sit at YOLO's confidence floor)
+    'enter_confidence': 0.25,
+    'min_dwell_seconds': 2.0,
+    # Close it once confidence stays below `exit_confidence` for `exit_dwell_seconds`
+    'exit_confidence': 0.15,
+    'exit_dwell_seconds': 6.0,
+    # After closing, don't re-open at the same or lower severity for
+    # `cooldown_seconds`; only a more severe event ends the cooldown early
+    'cooldown_seconds': 30.0,
+    # While open, emit an update on escalation or at most this often
+    'update_interval_seconds': 15.0,
+}
+
+class IncidentTracker:
+    """Hysteresis state machine turning per-analysis events into incidents.
+
+    Each key (a source id) moves through idle -> pending -> open -> cooldown.
+    `update` returns ('open' | 'update' | 'close', incident) when a transition
+    should be published, or None when the analysis is absorbed by the current
+    state.
+    """
+
+    def __init__(self):
+        self.states = {}
+        # Per-tracker ids keep replays deterministic
+        self.incident_ids = itertools.count(1)
+        # Cluster workers set a node prefix so ids stay unique across nodes
+        self.id_prefix = ''
+        self.lock = threading.Lock()
+
+    def update(self, key, medical_events, timestamp, settings):
+        """Feed one analysis result for `key` into the state machine"""
+        settings = dict(DEFAULT_INCIDENT_SETTINGS, **(settings or {}))
+        score = max((float(e.get('confidence', 0.0)) for e in medical_events), default=0.0)
+        severity = max((e.get('severity', 'low') for e in medical_events),
+                       key=lambda s: SEVERITY_RANK.get(s, 0), default='low')
+
+        with self.lock:
+            state = self.states.setdefault(key, {'state': 'idle'})
+
+            if state['state'] == 'cooldown':
+                if timestamp < state['until']:
+                    escalated = SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(state['severity'], 0)
+                    if not escalated or score < settings['enter_confidence']:
+                        return None
+                state.clear()
+                state['state'] = 'idle'
+
+            if state['state'] in ('idle', 'pending'):
+                if score < settings['enter_confidence']:
+                    state.clear()
+                    state['state'] = 'idle'
+                    return None
+                if state['state'] == 'idle':
+                    state['state'] = 'pending'
+                    state['since'] = timestamp
+                if timestamp - state['since'] < settings['min_dwell_seconds']:
+                    return None
+                incident = {
+                    'incident_id': f"{key}-{self.id_prefix}{next(self.incident_ids)}",
+                    'source_id': key,
+                    'state': 'open',
+                    'opened_at': timestamp,
+                    'updated_at': timestamp,
+                    'closed_at': None,
+                    'severity': severity,
+                    'peak_confidence': score,
+                    'event_types': sorted({e.get('type', 'general') for e in medical_events}),
+                }
+                self.states[key] = {
+                    'state': 'open',
+                    'incident': incident,
+                    'below_since': None,
+                    'last_emit': timestamp,
+                }
+                return 'open', dict(incident)
+
+            # state == 'open'
+            incident = state['incident']
+            if score < settings['exit_confidence']:
+                if state['below_since'] is None:
+                    state['below_since'] = timestamp
+                if timestamp - state['below_since'] < settings['exit_dwell_seconds']:
+                    return None
+                incident['state'] = 'closed'
+                incident['closed_at'] = timestamp
+                incident['updated_at'] = timestamp
+                self.states[key] = {
+                    'state': 'cooldown',
+                    'until': timestamp + settings['cooldown_seconds'],
+                    'severity': incident['severity'],
+                }
+                return 'close', dict(incident)
+
+            state['below_since'] = None
+            incident['updated_at'] = timestamp
+            incident['peak_confidence'] = max(incident['peak_confidence'], score)
+            incident['event_types'] = sorted(set(incident['event_types']) |
+                                             {e.get('type', 'general') for e in medical_events})
+            escalated = SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(incident['severity'], 0)
+            if escalated:
+                incident['severity'] = severity
+            if escalated or timestamp - state['last_emit'] >= settings['update_interval_seconds']:
+                state['last_emit'] = timestamp
+                return 'update', dict(incident, escalated=escalated)
+            return None
+
+    def open_incident(self, key):
+        """Return the currently open incident for `key`, if any"""
+        with self.lock:
+            state = self.states.get(key)
+            if state and state['state'] == 'open':
+                return dict(state['incident'])
+            return None
@@ -0,0 +1,188 @@
+"""End-to-end load generator for the post-inference path.
+
+Spins up N synthetic sources that feed generated person detections through
+`process_detections` on their own threads, with real HTTP calls to the
+configured Groq/VAPI endpoints (normally mock_services.py), and reports
+frame-to-alert latency.
+
+    python load_test.py --sources 50 --duration 120 --mock
+    python load_test.py --sources 20 --groq-url http://localhost:5055/openai/v1/chat/completions
+"""
+import argparse
+import random
+import threading
+import time
+
+import config
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_mock_server(host, port, mock_args):
+    """Run mock_services in a background thread; returns the fault injectors"""
+    from werkzeug.serving import make_server
+    from mock_services import FaultInjector, create_app
+
+    groq_faults = FaultInjector(mock_args.latency, mock_args.error_rate, mock_args.rate_limit,
+                                mock_args.throttle_after, mock_args.throttle_for)
+    vapi_faults = FaultInjector('uniform:0.1,0.3', mock_args.error_rate)
+    server = make_server(host, port, create_app(groq_faults, vapi_faults), threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return groq_faults, vapi_faults
+
+
+def make_load_detector():
+    """Build a detector that measures latency around the real network calls"""
+    from medical_detection import MedicalEventDetector
+
+    class LoadTestDetector(MedicalEventDetector):
+        def __init__(self):
+            self.local = threading.local()
+            self.lock = threading.Lock()
+            self.emits = 0
+            self.frame_latencies = []
+            self.alert_latencies = []
+            self.reasoning_outcomes = {}
+            super().__init__(emit=self.count_emit)
+
+        def count_emit(self, event, payload):
+            with self.lock:
+                self.emits += 1
+
+        def process_detections(self, source_id, frame_shape, detections, timestamp):
+            self.local.frame_started = time.perf_counter()
+            super().process_detections(source_id, frame_shape, detections, timestamp)
+            with self.lock:
+                self.frame_latencies.append(time.perf_counter() - self.local.frame_started)
+
+        def get_groq_reasoning(self, medical_events, detections, source_id):
+            reasoning = super().get_groq_reasoning(medical_events, detections, source_id)
+            if reasoning.startswith('Rate limit'):
+                outcome = 'rate_limited'
+            elif reasoning.startswith('Error'):
+                outcome = 'error'
+            else:
+                outcome = 'ok'
+            with self.lock:
+                self.reasoning_outcomes[outcome] = self.reasoning_outcomes.get(outcome, 0) + 1
+            return reasoning
+
+        def trigger_voice_alert(self, event_summary):
+            super().trigger_voice_alert(event_summary)
+            with self.lock:
+                self.alert_latencies.append(time.perf_counter() - self.local.frame_started)
+
+    return LoadTestDetector()
+
+
+def run_source(detector, source_id, args, stop):
+    """Alternate between a person in distress and an empty scene"""
+    frame_shape = (720, 1280)
+    period = args.incident_seconds + args.gap_seconds
+    offset = random.uniform(0, period)
+    started = time.time()
+    while not stop.is_set():
+        now = time.time()
+        phase = (now - started + offset) % period
+        detections = []
+        if phase < args.incident_seconds:
+            detections.append({
+                'class': 'person',
+                'confidence': random.uniform(0.75, 0.95),
+                'bbox': [400.0, 200.0, 700.0, 700.0]
+            })
+        detector.process_detections(source_id, frame_shape, detections, now)
+        stop.wait(args.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test alerting end to end')
+    parser.add_argument('--sources', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds to run')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between analyses per source')
+    parser.add_argument('--incident-seconds', type=float, default=10.0)
+    parser.add_argument('--gap-seconds', type=float, default=10.0)
+    parser.add_argument('--cooldown', type=float, default=0.0,
+                        help='incident cooldown used for the synthetic sources')
+    parser.add_argument('--groq-url', default=None)
+    parser.add_argument('--vapi-url', default=None)
+    parser.add_argument('--mock', action='store_true',
+                        help='start mock_services in-process and point at it')
+    parser.add_argument('--mock-port', type=int, default=5055)
+    parser.add_argument('--latency', default='lognormal:0.8,0.4',
+                        help='mock Groq latency distribution (with --mock)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0)
+    parser.add_argument('--throttle-after', type=float, default=None)
+    parser.add_argument('--throttle-for', type=float, default=60.0)
+    args = parser.parse_args()
+
+    mock_faults = None
+    if args.mock:
+        mock_faults = start_mock_server('127.0.0.1', args.mock_port, args)
+        base = f"http://127.0.0.1:{args.mock_port}"
+        config.GROQ_API_URL = f"{base}/openai/v1/chat/completions"
+        config.VAPI_API_URL = f"{base}/trigger-call"
+    if args.groq_url:
+        config.GROQ_API_URL = args.groq_url
+    if args.vapi_url:
+        config.VAPI_API_URL = args.vapi_url
+
+    detector = make_load_detector()
+    profile = {
+        'profile': 'cardiac',
+        'incident': {
+            'min_dwell_seconds': 0.0,
+            'exit_dwell_seconds': args.interval,
+            'cooldown_seconds': args.cooldown,
+        }
+    }
+    class_names = {0: 'person'}
+    source_ids = [f"load-{i}" for i in range(args.sources)]
+    for source_id in source_ids:
+        detector.register_source(source_id, profile, class_names)
+
+    print(f"🚦 Load test: {args.sources} sources for {args.duration:.0f}s")
+    print(f"🧠 Groq: {config.GROQ_API_URL}")
+    print(f"📞 VAPI: {config.VAPI_API_URL}")
+
+    stop = threading.Event()
+    threads = []
+    for source_id in source_ids:
+        thread = threading.Thread(target=run_source, args=(detector, source_id, args, stop))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    alerts = detector.alert_latencies
+    frames = detector.frame_latencies
+    print("")
+    print(f"Frames processed: {len(frames)}   emits: {detector.emits}   alerts: {len(alerts)}")
+    print(f"Frame latency     p50 {percentile(frames, 50) * 1000:8.1f} ms   "
+          f"p99 {percentile(frames, 99) * 1000:8.1f} ms")
+    print(f"Frame-to-alert    p50 {percentile(alerts, 50) * 1000:8.1f} ms   "
+          f"p99 {percentile(alerts, 99) * 1000:8.1f} ms   "
+          f"max {max(alerts, default=0.0) * 1000:8.1f} ms")
+    print(f"Reasoning outcomes: {detector.reasoning_outcomes}")
+    if mock_faults is not None:
+        groq_faults, vapi_faults = mock_faults
+        print(f"Mock Groq: {groq_faults.stats}")
+        print(f"Mock VAPI: {vapi_faults.stats}")
+
+
+if __name__ == '__main__':
+    main()
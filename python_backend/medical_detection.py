@@ -2,30 +2,120 @@ import cv2
 import numpy as np
 import requests
 import json
+import math
 import time
 import threading
 from ultralytics import YOLO
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import config
 import os
+import psutil
+from profiles import DetectorPipeline, resolve_profile
+from incidents import SEVERITY_RANK, IncidentTracker
+from replay import DetectionRecorder
+from preview import BOUNDARY, PreviewStream
+from frames import FrameBuffers
+from source_watchdog import Watchdog
 
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Initialize YOLOv8 model
-model = YOLO('yolov8n.pt')
+# YOLOv8 model, loaded on first use so replay and tooling can import
+# this module without paying for the weights
+model = None
+model_lock = threading.Lock()
+
+def get_model():
+    """Return the shared YOLOv8 model, loading it on first use"""
+    global model
+    with model_lock:
+        if model is None:
+            model = YOLO('yolov8n.pt')
+    return model
+
+def detect_objects(frame, input_size, class_ids):
+    """Run YOLOv8 on a frame and return detections as plain dicts.
+
+    Module-level so it can also run in a process pool (see async_server.py).
+    """
+    yolo = get_model()
+
+    # The class filter is applied inside NMS so unused classes never
+    # reach post-processing
+    results = yolo(frame, verbose=False, imgsz=input_size, classes=class_ids)
+    
+    detections = []
+    for result in results:
+        boxes = result.boxes
+        if boxes is not None and len(boxes):
+            xyxy = boxes.xyxy.cpu().numpy()
+            confs = boxes.conf.cpu().numpy()
+            classes = boxes.cls.cpu().numpy().astype(int)
+            for (x1, y1, x2, y2), conf, cls in zip(xyxy, confs, classes):
+                detections.append({
+                    'class': yolo.names[cls],
+                    'confidence': float(conf),
+                    'bbox': [float(x1), float(y1), float(x2), float(y2)]
+                })
+    return detections
+
+SKIPPED_REASONING = "AI analysis skipped - system under heavy load"
+
+# Source loops pace themselves to ~30 FPS
+FRAME_INTERVAL = 0.033
+
+def analysis_period(profile, factor, frame_seconds):
+    """Seconds a source loop takes between analyses at its measured frame pace.
+
+    Analysis runs on the first multiple of the (stretched) frame interval
+    that is also past the (stretched) time floor.
+    """
+    step = profile.analysis_interval * factor * frame_seconds
+    floor = profile.min_analysis_seconds * factor
+    return step * max(1, math.ceil(floor / step))
 
 class MedicalEventDetector:
-    def __init__(self):
+    def __init__(self, emit=None, alert=None):
+        # Socket.IO emit and a direct VAPI call by default; replay stubs
+        # these and cluster workers route them over the bus
+        self.emit = emit or socketio.emit
+        self.alert = alert or self.trigger_voice_alert
         self.video_sources = {}
         self.detection_threads = {}
         self.event_history = {}
+        self.profiles = {}
+        self.pipelines = {}
+        self.incidents = IncidentTracker()
+        self.recorders = {}
+        self.previews = {}
+        self.latest_detections = {}
+        self.frame_buffers = {}
+        self.loop_generations = {}
+        self.watchdog = Watchdog(self)
         
-    def add_video_source(self, source_id, video_path):
+    def register_source(self, source_id, profile=None, class_names=None):
+        """Resolve and compile a source's detection profile.
+
+        Returns the resolved profile, or None if the profile is invalid.
+        """
+        try:
+            resolved = resolve_profile(source_id, profile)
+            pipeline = DetectorPipeline(resolved, class_names or get_model().names)
+        except (ValueError, TypeError) as e:
+            print(f"Error: Invalid detection profile for {source_id}: {e}")
+            return None
+
+        self.event_history.setdefault(source_id, [])
+        self.profiles[source_id] = resolved
+        self.pipelines[source_id] = pipeline
+        return resolved
+
+    def add_video_source(self, source_id, video_path, profile=None):
         """Add a new video source for monitoring"""
+
         # Use absolute path for videos
         base_path = '/Users/alkadeviukrani/Downloads/project/videos'
         full_path = os.path.join(base_path, video_path)
@@ -33,287 +123,401 @@ class MedicalEventDetector:
         if not os.path.exists(full_path):
             print(f"Warning: Video file not found: {full_path}")
             return False
+
+        resolved = self.register_source(source_id, profile)
+        if resolved is None:
+            return False
             
         self.video_sources[source_id] = full_path
         self.event_history[source_id] = []
+        previous = self.previews.get(source_id)
+        if previous is not None:
+            previous.close()  # Re-added source: end viewers of the old stream
+        self.previews[source_id] = PreviewStream(source_id)
         
-        # Start detection thread for this source
-        thread = threading.Thread(target=self.detect_events, args=(source_id,))
-        thread.daemon = True
-        thread.start()
-        self.detection_threads[source_id] = thread
+        self.start_source_loop(source_id)
         
-        print(f"Started monitoring {source_id} with video: {full_path}")
+        print(f"Started monitoring {source_id} with video: {full_path} (profile: {resolved.name})")
         return True
         
-    def detect_events(self, source_id):
+    def remove_video_source(self, source_id):
+        """Stop monitoring a source; its loop exits at the next frame"""
+        # Unregister first so the watchdog can't restart the loop afterwards
+        self.watchdog.remove(source_id)
+        self.loop_generations[source_id] = self.loop_generations.get(source_id, 0) + 1
+        self.stop_recording(source_id)
+        stream = self.previews.get(source_id)
+        if stream is not None:
+            stream.close()  # Ends every open preview response
+        for sources in (self.video_sources, self.detection_threads, self.previews,
+                        self.frame_buffers, self.latest_detections):
+            sources.pop(source_id, None)
+        print(f"Stopped monitoring {source_id}")
+
+    def start_source_loop(self, source_id):
+        """Start (or restart) the detection thread for a source"""
+        # A new generation makes any previous, possibly hung, loop exit
+        generation = self.loop_generations.get(source_id, 0) + 1
+        self.loop_generations[source_id] = generation
+        self.watchdog.loop_started(source_id)
+
+        thread = threading.Thread(target=self.detect_events, args=(source_id, generation))
+        thread.daemon = True
+        thread.start()
+        self.detection_threads[source_id] = thread
+
+    def start_recording(self, source_id, path=None):
+        """Start recording a source's detection stream; returns the file path"""
+        if path is None:
+            os.makedirs(config.RECORDINGS_DIR, exist_ok=True)
+            path = os.path.join(config.RECORDINGS_DIR, f"{source_id}-{int(time.time())}.vsdr")
+        self.stop_recording(source_id)
+        self.recorders[source_id] = DetectionRecorder(
+            path, source_id, get_model().names, self.profiles.get(source_id))
+        print(f"Recording detections for {source_id} to {path}")
+        return path
+
+    def stop_recording(self, source_id):
+        """Stop recording a source; returns the number of frames written"""
+        recorder = self.recorders.pop(source_id, None)
+        if recorder is None:
+            return 0
+        recorder.close()
+        return recorder.frames
+
+    def detect_events(self, source_id, generation=None):
         """Main detection loop for a video source"""
         video_path = self.video_sources[source_id]
+        profile = self.profiles[source_id]
         cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
+            # The watchdog notices the exited thread and retries with backoff
             print(f"Error: Could not open video {video_path}")
             return
+
+        # Decode into reused buffers and downscale once to the profile's
+        # analysis resolution
+        buffers = FrameBuffers(profile.analysis_size)
+        self.frame_buffers[source_id] = buffers
             
         frame_count = 0
         last_analysis_time = 0
         
         print(f"Starting detection loop for {source_id}")
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Loop video
-                continue
-                
-            frame_count += 1
-            
-            # Analyze every 60 frames (2 seconds at 30fps) to reduce API calls
-            if frame_count % 60 == 0:
-                current_time = time.time()
-                if current_time - last_analysis_time > 3.0:  # Rate limiting - 3 seconds between calls
-                    self.analyze_frame(source_id, frame, current_time)
-                    last_analysis_time = current_time
+        # Measured seconds per frame (sleep plus decode), outside analyses
+        frame_seconds = FRAME_INTERVAL
+
+        try:
+            while generation is None or self.loop_generations.get(source_id) == generation:
+                started = time.time()
+                analyzed = False
+                self.watchdog.heartbeat(source_id)
+
+                ret, frame = buffers.read(cap)
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Loop video
+                    continue
                     
-            time.sleep(0.033)  # ~30 FPS
+                frame_count += 1
+
+                # Preview runs at its own fps, reusing the latest analysis
+                stream = self.previews.get(source_id)
+                if stream is not None:
+                    stream.publish(frame, self.latest_detections.get(source_id),
+                                   self.current_risk_level(source_id), buffers.source_shape)
+                
+                # Analyze every N frames (profile cadence, stretched by the
+                # watchdog when shedding load) to reduce API calls
+                factor = self.watchdog.cadence_factor(source_id)
+                self.watchdog.expect_analysis(
+                    source_id, analysis_period(profile, factor, frame_seconds))
+                if frame_count % (profile.analysis_interval * factor) == 0:
+                    current_time = time.time()
+                    if current_time - last_analysis_time > profile.min_analysis_seconds * factor:  # Rate limiting
+                        self.watchdog.analysis_started(source_id)
+                        self.analyze_frame(source_id, frame, current_time)
+                        last_analysis_time = current_time
+                        analyzed = True
+                        self.watchdog.analysis_done(source_id, time.time() - current_time)
+                        
+                time.sleep(FRAME_INTERVAL)  # ~30 FPS
+                if not analyzed:
+                    frame_seconds = 0.9 * frame_seconds + 0.1 * (time.time() - started)
+        finally:
+            cap.release()
             
     def analyze_frame(self, source_id, frame, timestamp):
         """Analyze a single frame for medical events"""
         try:
-            # Run YOLOv8 detection
-            results = model(frame, verbose=False)
-            
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = box.conf[0].cpu().numpy()
-                        cls = int(box.cls[0].cpu().numpy())
-                        
-                        detections.append({
-                            'class': model.names[cls],
-                            'confidence': float(conf),
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)]
-                        })
-            
-            # Analyze for medical events based on video type
-            medical_events = self.analyze_medical_events(detections, frame, source_id)
-            
-            # Emit YOLO detections to frontend regardless of events
-            try:
-                socketio.emit('yolo_detection', {
-                    'source_id': source_id,
-                    'timestamp': timestamp,
-                    'detections': detections
-                })
-            except Exception as e:
-                print(f"Error emitting yolo_detection: {e}")
-
-            if medical_events:
-                # Get detailed reasoning from Groq
-                reasoning = self.get_groq_reasoning(medical_events, detections, source_id)
-                
-                # Create event summary
-                try:
-                    event_description = ", ".join([
-                        (event.get('description') or event.get('type') or 'Medical event')
-                        for event in medical_events
-                    ])
-                except Exception:
-                    event_description = 'Medical event detected'
-
-                try:
-                    confidences = [float(event.get('confidence', 0.0)) for event in medical_events]
-                    overall_confidence = int(max(confidences) * 100) if confidences else 85
-                except Exception:
-                    overall_confidence = 85
-
-                event_summary = {
-                    'source_id': source_id,
-                    'timestamp': timestamp,
-                    'detections': detections,
-                    'medical_events': medical_events,
-                    'reasoning': reasoning,
-                    'groq_reasoning': reasoning,
-                    'event_description': event_description,
-                    'confidence': overall_confidence,
-                    'risk_level': self.assess_risk_level(medical_events)
-                }
-                
-                # Store in history
-                self.event_history[source_id].append(event_summary)
-                if len(self.event_history[source_id]) > 10:  # Keep last 10 events
-                    self.event_history[source_id].pop(0)
-                
-                # Emit to frontend
-                socketio.emit('medical_event', event_summary)
-
-                # Emit reasoning as a dedicated channel as well
-                try:
-                    socketio.emit('groq_analysis', {
-                        'source_id': source_id,
-                        'timestamp': timestamp,
-                        'reasoning': reasoning
-                    })
-                except Exception as e:
-                    print(f"Error emitting groq_analysis: {e}")
-                
-                # Trigger voice alert for critical events
-                if event_summary['risk_level'] in ['critical', 'high']:
-                    self.trigger_voice_alert(event_summary)
+            detections = self.run_inference(source_id, frame)
+            self.handle_inference(source_id, frame.shape, detections, timestamp)
                     
         except Exception as e:
+            self.watchdog.analysis_failed(source_id)
             print(f"Error analyzing frame: {e}")
-    
-    def analyze_medical_events(self, detections, frame, source_id):
-        """Analyze detections for medical events based on video type"""
-        events = []
-        
-        # Find person detections
-        person_detections = [d for d in detections if d['class'] == 'person']
-        
-        if person_detections:
-            # Analyze person pose and behavior based on video type
-            for person in person_detections:
-                bbox = person['bbox']
-                x1, y1, x2, y2 = bbox
-                
-                # Extract person region
-                person_region = frame[int(y1):int(y2), int(x1):int(x2)]
-                
-                if person_region.size > 0:
-                    # Analyze based on video type
-                    if 'heart-attack' in source_id or 'cardiac' in source_id:
-                        events.extend(self.detect_cardiac_events(person_region, person, frame))
-                    elif 'fall' in source_id:
-                        events.extend(self.detect_fall_events(person, frame))
-                    else:
-                        # General analysis
-                        events.extend(self.detect_general_medical_events(person_region, person, frame))
-        
-        return events
-    
-    def detect_cardiac_events(self, person_region, person, frame):
-        """Detect potential cardiac events"""
-        events = []
+
+    def handle_inference(self, source_id, analysis_shape, detections, timestamp):
+        """Map detections to source space, record them and run the post-inference path"""
+        # Boxes come back in analysis space; heuristics, recording and
+        # display all work in source space
+        frame_shape = analysis_shape
+        buffers = self.frame_buffers.get(source_id)
+        if buffers is not None:
+            buffers.to_source(detections)
+            frame_shape = buffers.source_shape
+
+        recorder = self.recorders.get(source_id)
+        if recorder is not None:
+            recorder.write(timestamp, detections, frame_shape)
+
+        self.process_detections(source_id, frame_shape, detections, timestamp)
+
+    def run_inference(self, source_id, frame):
+        """Run YOLOv8 on a frame and return detections as plain dicts"""
+        pipeline = self.pipelines[source_id]
+        return detect_objects(frame, pipeline.profile.input_size, pipeline.class_ids)
+
+    def process_detections(self, source_id, frame_shape, detections, timestamp):
+        """Post-inference path: heuristics, incidents, reasoning and alerting"""
+        # Analyze for medical events with the source's detector pipeline
+        medical_events = self.analyze_medical_events(detections, frame_shape, source_id)
         
-        if person['confidence'] > 0.7:
-            # Analyze body position and movement patterns
-            bbox = person['bbox']
-            x1, y1, x2, y2 = bbox
-            
-            # Check if person is clutching chest area
-            chest_region = frame[int(y1):int(y2), int(x1):int(x2)]
-            
-            # Simple heuristic: if person is detected with high confidence
-            # and in a medical context, flag for cardiac analysis
-            events.append({
-                'type': 'cardiac',
-                'severity': 'critical',
-                'confidence': person['confidence'],
-                'description': 'Person detected clutching chest - potential cardiac emergency',
-                'details': 'Patient appears to be experiencing chest pain and clutching left arm'
+        self.latest_detections[source_id] = detections
+
+        # Emit YOLO detections to frontend regardless of events
+        try:
+            self.emit('yolo_detection', {
+                'source_id': source_id,
+                'timestamp': timestamp,
+                'detections': detections
             })
-        
-        return events
+        except Exception as e:
+            print(f"Error emitting yolo_detection: {e}")
+
+        # Debounce through the incident state machine so one ongoing
+        # incident produces open/update/close instead of repeated events
+        transition = self.incidents.update(
+            source_id, medical_events, timestamp, self.profiles[source_id].incident)
+        if transition is not None:
+            state, incident = transition
+            if state == 'open':
+                self.open_incident(source_id, timestamp, detections, medical_events, incident)
+            elif state == 'update':
+                self.update_incident(source_id, timestamp, detections, medical_events, incident)
+            else:
+                self.close_incident(source_id, timestamp, incident)
+
+    def memory_usage(self, source_id):
+        """Bytes held per source by frame buffers and the preview stream"""
+        buffers = self.frame_buffers.get(source_id)
+        usage = buffers.memory_usage() if buffers is not None else {
+            'decode_buffer': 0, 'analysis_buffer': 0, 'source_shape': None, 'analysis_scale': 1.0}
+        stream = self.previews.get(source_id)
+        usage['preview_jpeg'] = len(stream.jpeg) if stream is not None and stream.jpeg else 0
+        usage['total'] = usage['decode_buffer'] + usage['analysis_buffer'] + usage['preview_jpeg']
+        return usage
+
+    def current_risk_level(self, source_id):
+        """Risk level of the source's open incident, or 'low'"""
+        incident = self.incidents.open_incident(source_id)
+        return incident['severity'] if incident else 'low'
+
+    def build_event_summary(self, source_id, timestamp, detections, medical_events):
+        """Summarize one analysis for history and the frontend"""
+        try:
+            event_description = ", ".join([
+                (event.get('description') or event.get('type') or 'Medical event')
+                for event in medical_events
+            ])
+        except Exception:
+            event_description = 'Medical event detected'
+
+        try:
+            confidences = [float(event.get('confidence', 0.0)) for event in medical_events]
+            overall_confidence = int(max(confidences) * 100) if confidences else 85
+        except Exception:
+            overall_confidence = 85
+
+        return {
+            'source_id': source_id,
+            'timestamp': timestamp,
+            'detections': detections,
+            'medical_events': medical_events,
+            'event_description': event_description,
+            'confidence': overall_confidence,
+            'risk_level': self.assess_risk_level(medical_events)
+        }
+
+    def find_history_entry(self, source_id, incident_id):
+        for entry in reversed(self.event_history.get(source_id, [])):
+            if entry.get('incident_id') == incident_id:
+                return entry
+        return None
+
+    def open_incident(self, source_id, timestamp, detections, medical_events, incident):
+        """Publish a newly opened incident: reasoning, history, emit and alert"""
+        event_summary = self.build_event_summary(source_id, timestamp, detections, medical_events)
+
+        # Get detailed reasoning from Groq (once per incident), unless the
+        # watchdog is shedding reasoning for this risk level
+        if self.watchdog.skip_reasoning(event_summary['risk_level']):
+            reasoning = SKIPPED_REASONING
+        else:
+            reasoning = self.get_groq_reasoning(medical_events, detections, source_id)
+        self.publish_incident(event_summary, reasoning, incident)
+
+    def publish_incident(self, event_summary, reasoning, incident, alert=True):
+        """Store, emit and (if high/critical) alert a newly opened incident"""
+        source_id = event_summary['source_id']
+        timestamp = event_summary['timestamp']
+        event_summary.update({
+            'reasoning': reasoning,
+            'groq_reasoning': reasoning,
+            'incident_id': incident['incident_id'],
+            'incident_state': 'open',
+            'opened_at': incident['opened_at'],
+            'alerted': False
+        })
+
+        # Store in history
+        self.event_history[source_id].append(event_summary)
+        if len(self.event_history[source_id]) > 10:  # Keep last 10 incidents
+            self.event_history[source_id].pop(0)
+
+        # Emit to frontend
+        self.emit('medical_event', event_summary)
+
+        # Emit reasoning as a dedicated channel as well
+        try:
+            self.emit('groq_analysis', {
+                'source_id': source_id,
+                'timestamp': timestamp,
+                'reasoning': reasoning
+            })
+        except Exception as e:
+            print(f"Error emitting groq_analysis: {e}")
+
+        # Trigger voice alert for critical events
+        if alert and event_summary['risk_level'] in ['critical', 'high']:
+            event_summary['alerted'] = True
+            self.alert(event_summary)
+
+    def update_incident(self, source_id, timestamp, detections, medical_events, incident):
+        """Refresh an open incident in place without a new reasoning call"""
+        entry = self.find_history_entry(source_id, incident['incident_id'])
+        if entry is None:
+            return
+        summary = self.build_event_summary(source_id, timestamp, detections, medical_events)
+        # The entry reports the incident's tracked severity and peak
+        # confidence; a quieter frame only refreshes timestamp and detections
+        if SEVERITY_RANK[summary['risk_level']] < SEVERITY_RANK.get(incident['severity'], 0):
+            for key in ('medical_events', 'event_description'):
+                summary.pop(key)
+        summary['risk_level'] = incident['severity']
+        summary['confidence'] = max(entry['confidence'], summary['confidence'])
+        entry.update(summary)
+        entry['incident_state'] = 'open'
+
+        self.emit('incident_update', {
+            'source_id': source_id,
+            'incident_id': incident['incident_id'],
+            'timestamp': timestamp,
+            'risk_level': entry['risk_level'],
+            'confidence': entry['confidence'],
+            'event_description': entry['event_description'],
+            'escalated': incident.get('escalated', False)
+        })
+
+        # Alert once per incident, when it first reaches high/critical (an
+        # alert waiting on reasoning is placed once the reasoning arrives)
+        if (not entry.get('alerted') and not entry.get('reasoning_pending')
+                and entry['risk_level'] in ['critical', 'high']):
+            entry['alerted'] = True
+            self.alert(entry)
+
+    def close_incident(self, source_id, timestamp, incident):
+        """Mark an incident closed in history and notify the frontend"""
+        entry = self.find_history_entry(source_id, incident['incident_id'])
+        if entry is not None:
+            entry['incident_state'] = 'closed'
+            entry['closed_at'] = timestamp
+
+        self.emit('incident_closed', {
+            'source_id': source_id,
+            'incident_id': incident['incident_id'],
+            'timestamp': timestamp,
+            'opened_at': incident['opened_at'],
+            'duration': timestamp - incident['opened_at']
+        })
+
+    def analyze_medical_events(self, detections, frame_shape, source_id):
+        """Analyze detections for medical events using the source's detector pipeline"""
+        return self.pipelines[source_id].run(detections, frame_shape)
     
-    def detect_fall_events(self, person, frame):
-        """Detect potential fall events"""
-        events = []
+    def build_reasoning_request(self, medical_events, detections, source_id):
+        """Headers and JSON body for the Groq chat-completions call"""
+        # Prepare context for Groq based on the source's profile
+        video_context = self.profiles[source_id].context
         
-        bbox = person['bbox']
-        x1, y1, x2, y2 = bbox
-        height = y2 - y1
-        width = x2 - x1
+        prompt = f"""
+        {video_context}Analyze this medical monitoring data and provide detailed reasoning:
         
-        # Fall detection: if person is very close to bottom of frame
-        frame_height = frame.shape[0]
-        if y2 > frame_height * 0.8:  # Person near bottom of frame
-            events.append({
-                'type': 'fall',
-                'severity': 'critical',
-                'confidence': person['confidence'],
-                'description': 'Person detected near floor level - potential fall event',
-                'details': 'Patient appears to have fallen and is on the ground'
-            })
+        Medical Events: {json.dumps(medical_events, indent=2)}
+        Detections: {json.dumps(detections, indent=2)}
         
-        return events
-    
-    def detect_general_medical_events(self, person_region, person, frame):
-        """Detect general medical events"""
-        events = []
+        Provide a detailed analysis explaining:
+        1. What medical conditions might be indicated
+        2. Specific behavioral or physical signs observed
+        3. Risk assessment and urgency level
+        4. Recommended medical response
         
-        if person['confidence'] > 0.8:
-            events.append({
-                'type': 'general',
-                'severity': 'medium',
-                'confidence': person['confidence'],
-                'description': 'Person detected - monitoring for medical issues',
-                'details': 'Patient is being monitored for any signs of distress'
-            })
+        Format your response as a natural language explanation suitable for medical staff.
+        Be specific about the signs and symptoms observed.
+        """
         
-        return events
-    
+        headers = {
+            'Authorization': f'Bearer {config.GROQ_API_KEY}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = {
+            'model': 'meta-llama/llama-4-scout-17b-16e-instruct',
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'max_tokens': 500,
+            'temperature': 0.7
+        }
+        return headers, data
+
+    def parse_reasoning_response(self, status_code, result):
+        """Turn a Groq response status and JSON body into reasoning text"""
+        if status_code == 200:
+            return result['choices'][0]['message']['content']
+        elif status_code == 429:
+            return "Rate limit exceeded - AI analysis temporarily unavailable"
+        else:
+            return f"Error getting reasoning: {status_code}"
+
     def get_groq_reasoning(self, medical_events, detections, source_id):
         """Get detailed reasoning from Groq LLM"""
         try:
-            # Prepare context for Groq based on video type
-            video_context = ""
-            if 'heart-attack' in source_id or 'cardiac' in source_id:
-                video_context = "This is a cardiac emergency monitoring scenario. "
-            elif 'fall' in source_id:
-                video_context = "This is a fall detection monitoring scenario. "
-            
-            prompt = f"""
-            {video_context}Analyze this medical monitoring data and provide detailed reasoning:
-            
-            Medical Events: {json.dumps(medical_events, indent=2)}
-            Detections: {json.dumps(detections, indent=2)}
-            
-            Provide a detailed analysis explaining:
-            1. What medical conditions might be indicated
-            2. Specific behavioral or physical signs observed
-            3. Risk assessment and urgency level
-            4. Recommended medical response
-            
-            Format your response as a natural language explanation suitable for medical staff.
-            Be specific about the signs and symptoms observed.
-            """
-            
-            headers = {
-                'Authorization': f'Bearer {config.GROQ_API_KEY}',
-                'Content-Type': 'application/json'
-            }
-            
-            data = {
-                'model': 'meta-llama/llama-4-scout-17b-16e-instruct',
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                'max_tokens': 500,
-                'temperature': 0.7
-            }
+            headers, data = self.build_reasoning_request(medical_events, detections, source_id)
             
             response = requests.post(
-                'https://api.groq.com/openai/v1/chat/completions',
+                config.GROQ_API_URL,
                 headers=headers,
                 json=data,
                 timeout=10
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                reasoning = result['choices'][0]['message']['content']
-                return reasoning
-            elif response.status_code == 429:
-                return "Rate limit exceeded - AI analysis temporarily unavailable"
-            else:
-                return f"Error getting reasoning: {response.status_code}"
+            result = response.json() if response.status_code == 200 else None
+            return self.parse_reasoning_response(response.status_code, result)
                 
         except Exception as e:
             return f"Error in reasoning analysis: {str(e)}"
@@ -329,12 +533,17 @@ class MedicalEventDetector:
         else:
             return 'low'
     
+    def build_alert_message(self, event_summary):
+        """Spoken message for a voice alert"""
+        alert_message = f"Medical alert: {event_summary['risk_level']} risk detected. "
+        alert_message += event_summary['reasoning'][:200] + "..."
+        return alert_message
+
     def trigger_voice_alert(self, event_summary):
         """Trigger voice alert using VAPI"""
         try:
             # Prepare alert message
-            alert_message = f"Medical alert: {event_summary['risk_level']} risk detected. "
-            alert_message += event_summary['reasoning'][:200] + "..."
+            alert_message = self.build_alert_message(event_summary)
             
             # Log alert locally
             print(f"VOICE ALERT: {alert_message}")
@@ -342,7 +551,7 @@ class MedicalEventDetector:
             # Perform VAPI call
             try:
                 vapi_response = requests.post(
-                    'https://api.vapi.ai/trigger-call',
+                    config.VAPI_API_URL,
                     headers={
                         'Authorization': f'Bearer {config.VAPI_API_KEY}',
                         'Content-Type': 'application/json'
@@ -363,6 +572,16 @@ class MedicalEventDetector:
 # Initialize detector
 detector = MedicalEventDetector()
 
+# Set in coordinator and front-end modes; sources are then assigned to
+# worker nodes by the coordinator
+cluster_node = None
+
+def add_source(source_id, video_path, profile=None):
+    """Add a source locally, or hand it to the coordinator in cluster mode"""
+    if cluster_node is not None:
+        return cluster_node.add_source(source_id, video_path, profile)
+    return detector.add_video_source(source_id, video_path, profile)
+
 # Socket.IO event handlers
 @socketio.on('connect')
 def handle_connect():
@@ -379,9 +598,10 @@ def handle_add_video(data):
     try:
         source_id = data.get('source_id')
         video_path = data.get('video_path')
+        profile = data.get('profile')
         
         if source_id and video_path:
-            success = detector.add_video_source(source_id, video_path)
+            success = add_source(source_id, video_path, profile)
             if success:
                 emit('video_added', {
                     'source_id': source_id,
@@ -433,11 +653,12 @@ def add_video():
         data = request.get_json()
         source_id = data.get('source_id')
         video_path = data.get('video_path')
+        profile = data.get('profile')
         
         if not source_id or not video_path:
             return jsonify({'error': 'Missing source_id or video_path'}), 400
         
-        success = detector.add_video_source(source_id, video_path)
+        success = add_source(source_id, video_path, profile)
         
         if success:
             return jsonify({
@@ -466,15 +687,63 @@ def get_events(source_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/profiles/<source_id>', methods=['GET'])
+def get_profile(source_id):
+    """Get the detection profile a source was registered with"""
+    profile = detector.profiles.get(source_id)
+    if profile is None:
+        return jsonify({'error': f'Unknown source {source_id}'}), 404
+    return jsonify({'source_id': source_id, 'profile': profile.to_dict()})
+
+@app.route('/api/recordings/<source_id>', methods=['POST'])
+def start_recording(source_id):
+    """Start recording a source's detections for replay"""
+    if source_id not in detector.video_sources:
+        return jsonify({'error': f'Unknown source {source_id}'}), 404
+    try:
+        data = request.get_json(silent=True) or {}
+        path = detector.start_recording(source_id, data.get('path'))
+        return jsonify({'status': 'recording', 'source_id': source_id, 'path': path})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recordings/<source_id>', methods=['DELETE'])
+def stop_recording(source_id):
+    """Stop recording a source"""
+    frames = detector.stop_recording(source_id)
+    return jsonify({'status': 'stopped', 'source_id': source_id, 'frames': frames})
+
+@app.route('/api/preview/<source_id>', methods=['GET'])
+def preview(source_id):
+    """Annotated MJPEG preview of a source"""
+    stream = detector.previews.get(source_id)
+    if stream is None:
+        return jsonify({'error': f'Unknown source {source_id}'}), 404
+    return Response(stream.frames(),
+                    mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return jsonify(health_status(detector))
+
+def health_status(detector):
+    """Health and metrics snapshot, shared by the Flask and asyncio servers"""
+    return {
         'status': 'healthy',
         'timestamp': time.time(),
         'active_sources': len(detector.video_sources),
-        'total_events': sum(len(events) for events in detector.event_history.values())
-    })
+        'total_events': sum(len(events) for events in detector.event_history.values()),
+        'open_incidents': sum(1 for source_id in detector.video_sources
+                              if detector.incidents.open_incident(source_id)),
+        'memory': {
+            'rss_bytes': psutil.Process().memory_info().rss,
+            'sources': {source_id: detector.memory_usage(source_id)
+                        for source_id in detector.video_sources}
+        },
+        'watchdog': detector.watchdog.status(),
+        'cluster': cluster_node.status() if cluster_node is not None else None
+    }
 
 @app.route('/api/trigger_call', methods=['POST'])
 def trigger_call():
@@ -492,13 +761,57 @@ def trigger_call():
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
+def run_cluster_node(args):
+    """Join the bus as a coordinator, worker or front-end node"""
+    global cluster_node
+    from bus import BusClient
+    from cluster import Coordinator, FrontendRelay, Worker
+
+    bus = BusClient(config.CLUSTER_BUS_URL)
+    print(f"📨 Bus: {config.CLUSTER_BUS_URL} ({args.mode})")
+
+    if args.mode == 'worker':
+        node_id = args.node_id or f"worker-{os.getpid()}"
+        get_model()
+        detector.watchdog.start()
+        print(f"🛠️  Worker {node_id}: waiting for source assignments")
+        Worker(bus, detector, node_id).run_forever()
+        return
+
+    if args.mode == 'coordinator':
+        cluster_node = Coordinator(bus, detector, socketio.emit)
+        cluster_node.start()
+    else:
+        cluster_node = FrontendRelay(bus, detector, socketio.emit,
+                                     args.node_id or f"frontend-{os.getpid()}")
+        cluster_node.request_history()
+
+    print(f"🌐 Server: http://localhost:{args.port}")
+    socketio.run(app, host='0.0.0.0', port=args.port, debug=False)
+
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Medical Emergency Detection backend')
+    parser.add_argument('--mode', default='standalone',
+                        choices=['standalone', 'async', 'coordinator', 'worker', 'frontend'])
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--node-id', default=None)
+    args = parser.parse_args()
+
+    if args.mode == 'async':
+        from async_server import run
+        run(args.port)
+        raise SystemExit(0)
+    if args.mode != 'standalone':
+        run_cluster_node(args)
+        raise SystemExit(0)
+
     print("🏥 Starting Medical Emergency Detection System...")
     print("🤖 YOLOv8 Model: Loaded")
     print("🧠 Groq LLM: Ready")
     print("📡 Socket.IO: Active")
-    print("🌐 Server: http://localhost:5001")
-    print("📊 Health Check: http://localhost:5001/api/health")
+    print(f"🌐 Server: http://localhost:{args.port}")
+    print(f"📊 Health Check: http://localhost:{args.port}/api/health")
     print("")
     print("🎯 Monitoring for:")
     print("   • Cardiac emergencies (person clutching chest)")
@@ -508,5 +821,8 @@ if __name__ == '__main__':
     print("🚨 Voice alerts will trigger for critical events")
     print("📱 Real-time updates via Socket.IO")
     print("")
+
+    get_model()
+    detector.watchdog.start()
     
-    socketio.run(app, host='0.0.0.0', port=5001, debug=False) 
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=args.port, debug=False) 
\ No newline at end of file
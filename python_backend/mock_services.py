@@ -0,0 +1,165 @@
+"""Local stand-ins for the Groq chat-completions and VAPI endpoints.
+
+Serves the two routes the backend calls, with configurable latency,
+random errors and rate limiting, so alerting can be load-tested without
+spending API quota. Point the backend at it with:
+
+    GROQ_API_URL=http://localhost:5055/openai/v1/chat/completions
+    VAPI_API_URL=http://localhost:5055/trigger-call
+
+    python mock_services.py --latency lognormal:0.8,0.4 --rate-limit 5
+    python mock_services.py --throttle-after 30 --throttle-for 60
+"""
+import argparse
+import math
+import random
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+
+def parse_latency(spec):
+    """Parse a latency distribution spec into a sampler returning seconds.
+
+    fixed:S, uniform:LO,HI, normal:MEAN,STD and lognormal:MEDIAN,SIGMA are
+    supported; a bare number is treated as fixed.
+    """
+    kind, _, args = spec.partition(':')
+    if not args:
+        kind, args = 'fixed', kind
+    values = [float(v) for v in args.split(',')]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+class FaultInjector:
+    """Decides, per request, how long to stall and what status to return"""
+
+    def __init__(self, latency='fixed:0.2', error_rate=0.0, rate_limit=0.0,
+                 throttle_after=None, throttle_for=0.0):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        # Token bucket: `rate_limit` requests per second, burst of one second
+        # (at least one request, so rates below 1/s still let requests through)
+        self.rate_limit = rate_limit
+        self.burst = max(1.0, rate_limit)
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        # Forced 429 window, relative to server start
+        self.started = time.monotonic()
+        self.throttle_after = throttle_after
+        self.throttle_for = throttle_for
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0}
+
+    def throttled(self, now):
+        if self.throttle_after is None:
+            return False
+        elapsed = now - self.started
+        return self.throttle_after <= elapsed < self.throttle_after + self.throttle_for
+
+    def decide(self):
+        """Return (delay_seconds, status_code) for the next request"""
+        now = time.monotonic()
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.rate_limit > 0:
+                self.tokens = min(self.burst,
+                                  self.tokens + (now - self.last_refill) * self.rate_limit)
+                self.last_refill = now
+            if self.throttled(now) or (self.rate_limit > 0 and self.tokens < 1):
+                self.stats['rate_limited'] += 1
+                return 0.0, 429
+            if self.rate_limit > 0:
+                self.tokens -= 1
+            if random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return self.sample_latency(), 500
+            self.stats['ok'] += 1
+        return self.sample_latency(), 200
+
+
+def create_app(groq_faults, vapi_faults):
+    app = Flask(__name__)
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        delay, status = groq_faults.decide()
+        time.sleep(delay)
+        if status == 429:
+            return jsonify({'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}}), 429
+        if status != 200:
+            return jsonify({'error': {'message': 'Injected failure', 'type': 'server_error'}}), status
+        data = request.get_json(silent=True) or {}
+        return jsonify({
+            'id': f"mock-{int(time.time() * 1000)}",
+            'object': 'chat.completion',
+            'model': data.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {
+                    'role': 'assistant',
+                    'content': 'Mock analysis: signs consistent with the reported event. '
+                               'Recommend immediate assessment by medical staff.'
+                },
+                'finish_reason': 'stop'
+            }]
+        })
+
+    @app.route('/trigger-call', methods=['POST'])
+    def trigger_call():
+        delay, status = vapi_faults.decide()
+        time.sleep(delay)
+        if status == 429:
+            return jsonify({'error': 'Too many requests'}), 429
+        if status != 200:
+            return jsonify({'error': 'Injected failure'}), status
+        return jsonify({'status': 'queued', 'id': f"call-{int(time.time() * 1000)}"})
+
+    @app.route('/mock/stats', methods=['GET'])
+    def stats():
+        return jsonify({'groq': groq_faults.stats, 'vapi': vapi_faults.stats})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Groq and VAPI endpoints')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency', default='lognormal:0.8,0.4',
+                        help='Groq latency distribution (fixed:S, uniform:LO,HI, '
+                             'normal:MEAN,STD, lognormal:MEDIAN,SIGMA)')
+    parser.add_argument('--vapi-latency', default='uniform:0.1,0.3',
+                        help='VAPI latency distribution')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help='Groq requests per second before HTTP 429 (0 = unlimited)')
+    parser.add_argument('--throttle-after', type=float, default=None,
+                        help='seconds after start at which Groq answers only 429')
+    parser.add_argument('--throttle-for', type=float, default=60.0,
+                        help='length of the forced 429 window in seconds')
+    args = parser.parse_args()
+
+    groq_faults = FaultInjector(args.latency, args.error_rate, args.rate_limit,
+                                args.throttle_after, args.throttle_for)
+    vapi_faults = FaultInjector(args.vapi_latency, args.error_rate)
+
+    print(f"🧪 Mock Groq:  http://{args.host}:{args.port}/openai/v1/chat/completions")
+    print(f"🧪 Mock VAPI:  http://{args.host}:{args.port}/trigger-call")
+    print(f"📊 Stats:      http://{args.host}:{args.port}/mock/stats")
+    create_app(groq_faults, vapi_faults).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import cv2
+
+import config
+
+# Box colors (BGR) by risk level
+RISK_COLORS = {
+    'critical': (0, 0, 255),
+    'high': (0, 140, 255),
+    'medium': (0, 215, 255),
+    'low': (0, 200, 0),
+}
+OTHER_COLOR = (160, 160, 160)
+
+BOUNDARY = 'frame'
+
+
+class PreviewStream:
+    """Annotated MJPEG preview for one source.
+
+    The source loop calls `publish` for every decoded frame; at most
+    `fps` frames per second are annotated and JPEG-encoded, once, and only
+    while someone is watching. Each viewer's generator always jumps to the
+    newest frame, so a slow client drops frames instead of queueing them.
+    """
+
+    def __init__(self, source_id, fps=None, width=None, quality=None):
+        self.source_id = source_id
+        self.interval = 1.0 / (fps or config.PREVIEW_FPS)
+        self.width = width or config.PREVIEW_WIDTH
+        self.quality = quality or config.PREVIEW_JPEG_QUALITY
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.sequence = 0
+        self.viewers = 0
+        self.last_publish = 0.0
+        self.closed = False
+
+    def publish(self, frame, detections=None, risk_level='low', source_shape=None):
+        """Annotate and encode a frame if a viewer is due one.
+
+        `frame` may already be downscaled; boxes are in `source_shape` space.
+        """
+        now = time.time()
+        if self.closed or self.viewers == 0 or now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+
+        height, width = (source_shape or frame.shape)[:2]
+        scale = min(1.0, self.width / float(width))
+        size = (int(width * scale), int(height * scale))
+        if (frame.shape[1], frame.shape[0]) != size:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+
+        for index, d in enumerate(detections or []):
+            x1, y1, x2, y2 = [int(v * scale) for v in d['bbox']]
+            color = RISK_COLORS.get(risk_level, OTHER_COLOR) if d['class'] == 'person' else OTHER_COLOR
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            label = f"#{d.get('track_id', index)} {d['class']} {d['confidence']:.2f}"
+            cv2.putText(frame, label, (x1, max(12, y1 - 4)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1, cv2.LINE_AA)
+
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self.condition:
+            self.jpeg = encoded.tobytes()
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def close(self):
+        """Stop publishing and end every viewer's generator"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def attach(self):
+        with self.condition:
+            self.viewers += 1
+
+    def detach(self):
+        with self.condition:
+            self.viewers -= 1
+
+    @staticmethod
+    def part(jpeg):
+        """One multipart chunk holding a JPEG frame"""
+        return (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                f"Content-Length: {len(jpeg)}\r\n\r\n").encode('ascii') + jpeg + b"\r\n"
+
+    def frames(self):
+        """Multipart generator for one viewer"""
+        self.attach()
+        try:
+            seen = 0
+            while not self.closed:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.closed or self.sequence != seen,
+                                            timeout=5.0)
+                    if self.closed:
+                        return
+                    if self.sequence == seen:
+                        continue
+                    seen = self.sequence
+                    jpeg = self.jpeg
+                yield self.part(jpeg)
+        finally:
+            self.detach()
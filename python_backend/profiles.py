@@ -0,0 +1,246 @@
+import numpy as np
+
+# Registry of detector functions, keyed by the name used in profiles.
+# Each detector receives every person in a frame at once:
+#   boxes       - float64 array of shape (N, 4) holding x1, y1, x2, y2
+#   confidences - float64 array of shape (N,)
+#   frame_shape - (height, width) of the frame the boxes refer to
+#   thresholds  - the profile's threshold dict
+# and returns a list of medical event dicts.
+DETECTORS = {}
+
+
+def register_detector(name):
+    """Register a vectorized detector under the given name"""
+    def decorator(func):
+        DETECTORS[name] = func
+        return func
+    return decorator
+
+
+def _make_events(mask, confidences, event):
+    return [dict(event, confidence=float(conf)) for conf in confidences[mask]]
+
+
+@register_detector('cardiac')
+def detect_cardiac_events(boxes, confidences, frame_shape, thresholds):
+    """Detect potential cardiac events"""
+    # Simple heuristic: if person is detected with high confidence
+    # and in a medical context, flag for cardiac analysis
+    mask = confidences > thresholds['cardiac_confidence']
+    return _make_events(mask, confidences, {
+        'type': 'cardiac',
+        'severity': 'critical',
+        'description': 'Person detected clutching chest - potential cardiac emergency',
+        'details': 'Patient appears to be experiencing chest pain and clutching left arm'
+    })
+
+
+@register_detector('fall')
+def detect_fall_events(boxes, confidences, frame_shape, thresholds):
+    """Detect potential fall events"""
+    # Fall detection: if person is very close to bottom of frame
+    frame_height = frame_shape[0]
+    mask = boxes[:, 3] > frame_height * thresholds['fall_floor_ratio']
+    return _make_events(mask, confidences, {
+        'type': 'fall',
+        'severity': 'critical',
+        'description': 'Person detected near floor level - potential fall event',
+        'details': 'Patient appears to have fallen and is on the ground'
+    })
+
+
+@register_detector('general')
+def detect_general_medical_events(boxes, confidences, frame_shape, thresholds):
+    """Detect general medical events"""
+    mask = confidences > thresholds['general_confidence']
+    return _make_events(mask, confidences, {
+        'type': 'general',
+        'severity': 'medium',
+        'description': 'Person detected - monitoring for medical issues',
+        'details': 'Patient is being monitored for any signs of distress'
+    })
+
+
+DEFAULT_THRESHOLDS = {
+    'cardiac_confidence': 0.7,
+    'fall_floor_ratio': 0.8,
+    'general_confidence': 0.8,
+}
+
+
+def _positive(field, value, cast):
+    """`value` cast with `cast`, or ValueError unless it is a positive number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if cast(value) <= 0:
+        raise ValueError(f"{field} must be positive, got {value!r}")
+    return cast(value)
+
+
+def _numbers(field, values):
+    """Check that every value in a settings dict is a number"""
+    for key, value in values.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{field}.{key} must be a number, got {value!r}")
+    return values
+
+
+class DetectionProfile:
+    """Per-source detection settings, fixed when the source is added"""
+
+    def __init__(self, name, detectors, context='', thresholds=None,
+                 analysis_interval=60, min_analysis_seconds=3.0,
+                 input_size=640, analysis_size=1280, classes=None,
+                 incident=None):
+        self.name = name
+        self.detectors = tuple(detectors)
+        self.context = context
+        # Profiles can come straight from an add_video request, so bad
+        # values are rejected here rather than failing in the source loop
+        self.thresholds = _numbers('thresholds', dict(DEFAULT_THRESHOLDS, **(thresholds or {})))
+        # Analyze every `analysis_interval` frames, but never more often
+        # than once per `min_analysis_seconds`
+        self.analysis_interval = _positive('analysis_interval', analysis_interval, int)
+        self.min_analysis_seconds = _positive('min_analysis_seconds', min_analysis_seconds, float)
+        # Inference size passed to YOLO (imgsz)
+        self.input_size = _positive('input_size', input_size, int)
+        # Frames are downscaled right after decode so their longest side is
+        # at most `analysis_size` pixels
+        self.analysis_size = _positive('analysis_size', analysis_size, int)
+        # YOLO class names to keep; None keeps every class (the frontend
+        # draws non-person objects, so built-in profiles keep them all)
+        self.classes = tuple(classes) if classes is not None else None
+        # Overrides for the incident state machine (see incidents.py)
+        self.incident = _numbers('incident', dict(incident or {}))
+
+    def with_overrides(self, overrides):
+        """Return a copy of this profile with the given fields replaced"""
+        overrides = dict(overrides or {})
+        thresholds = dict(self.thresholds, **overrides.pop('thresholds', {}))
+        incident = dict(self.incident, **overrides.pop('incident', {}))
+        fields = {
+            'name': self.name,
+            'detectors': self.detectors,
+            'context': self.context,
+            'thresholds': thresholds,
+            'analysis_interval': self.analysis_interval,
+            'min_analysis_seconds': self.min_analysis_seconds,
+            'input_size': self.input_size,
+            'analysis_size': self.analysis_size,
+            'classes': self.classes,
+            'incident': incident,
+        }
+        unknown = set(overrides) - set(fields)
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+        fields.update(overrides)
+        return DetectionProfile(**fields)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'detectors': list(self.detectors),
+            'context': self.context,
+            'thresholds': dict(self.thresholds),
+            'analysis_interval': self.analysis_interval,
+            'min_analysis_seconds': self.min_analysis_seconds,
+            'input_size': self.input_size,
+            'analysis_size': self.analysis_size,
+            'classes': list(self.classes) if self.classes is not None else None,
+            'incident': dict(self.incident),
+        }
+
+
+PROFILES = {
+    'cardiac': DetectionProfile(
+        'cardiac', ['cardiac'],
+        context="This is a cardiac emergency monitoring scenario. "),
+    'fall': DetectionProfile(
+        'fall', ['fall'],
+        context="This is a fall detection monitoring scenario. "),
+    'general': DetectionProfile('general', ['general']),
+}
+
+
+def register_profile(profile):
+    """Register a named profile so sources can refer to it by name"""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def default_profile_name(source_id):
+    """Pick a built-in profile from the source id (legacy naming convention)"""
+    if 'heart-attack' in source_id or 'cardiac' in source_id:
+        return 'cardiac'
+    elif 'fall' in source_id:
+        return 'fall'
+    return 'general'
+
+
+def resolve_profile(source_id, profile=None):
+    """Resolve a profile name, override dict or None into a DetectionProfile.
+
+    A dict may name a base profile under 'profile'; the remaining keys
+    override that profile's fields.
+    """
+    if isinstance(profile, DetectionProfile):
+        return profile
+    if profile is None or isinstance(profile, str):
+        name = profile or default_profile_name(source_id)
+        if name not in PROFILES:
+            raise ValueError(f"Unknown detection profile: {name}")
+        return PROFILES[name]
+    overrides = dict(profile)
+    base = resolve_profile(source_id, overrides.pop('profile', None))
+    return base.with_overrides(overrides)
+
+
+class DetectorPipeline:
+    """A profile compiled against the model's class names.
+
+    Detector functions and YOLO class ids are looked up once here so the
+    per-frame path is just array slicing and one call per detector.
+    """
+
+    def __init__(self, profile, class_names):
+        unknown = [name for name in profile.detectors if name not in DETECTORS]
+        if unknown:
+            raise ValueError(f"Unknown detectors: {', '.join(unknown)}")
+        self.profile = profile
+        self.detectors = [DETECTORS[name] for name in profile.detectors]
+        if profile.classes is None:
+            self.class_ids = None
+        else:
+            ids_by_name = {name: cls for cls, name in class_names.items()}
+            unknown = [name for name in profile.classes if name not in ids_by_name]
+            if unknown:
+                raise ValueError(f"Unknown classes: {', '.join(unknown)}")
+            if not profile.classes:
+                raise ValueError("Class filter is empty; use None to keep every class")
+            self.class_ids = [ids_by_name[name] for name in profile.classes]
+
+    def run(self, detections, frame_shape):
+        """Run every enabled detector over all persons in a frame"""
+        persons = [d for d in detections if d['class'] == 'person']
+        if not persons:
+            return []
+
+        boxes = np.array([d['bbox'] for d in persons], dtype=np.float64)
+        confidences = np.array([d['confidence'] for d in persons], dtype=np.float64)
+
+        # Drop boxes that are empty once clipped to the frame
+        height, width = frame_shape[:2]
+        x1 = np.clip(boxes[:, 0].astype(int), 0, width)
+        y1 = np.clip(boxes[:, 1].astype(int), 0, height)
+        x2 = np.clip(boxes[:, 2].astype(int), 0, width)
+        y2 = np.clip(boxes[:, 3].astype(int), 0, height)
+        valid = (x2 > x1) & (y2 > y1)
+        if not valid.any():
+            return []
+        boxes, confidences = boxes[valid], confidences[valid]
+
+        events = []
+        for detector in self.detectors:
+            events.extend(detector(boxes, confidences, frame_shape, self.profile.thresholds))
+        return events
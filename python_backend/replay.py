@@ -0,0 +1,226 @@
+"""Record and replay per-frame detection streams.
+
+The recorder captures what `run_inference` returned for each analyzed
+frame; the replayer feeds those detections back through the post-inference
+path (heuristics, incidents, risk, reasoning, alerting) with Groq, VAPI and
+Socket.IO stubbed out, so event output can be regression-tested and
+benchmarked without YOLO or video.
+
+    python replay.py recordings/cardiac_emergency.vsdr --repeat 1000
+    python replay.py rec.vsdr --output expected.json
+    python replay.py rec.vsdr --expect expected.json
+"""
+import argparse
+import copy
+import json
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b'VSDR'
+VERSION = 1
+
+# File header: magic, version, length of the JSON metadata that follows
+HEADER = struct.Struct('<4sHI')
+# Per-frame record: timestamp, frame height, frame width, detection count
+RECORD = struct.Struct('<dHHH')
+# Per-detection: x1, y1, x2, y2, confidence, class index
+DETECTION = struct.Struct('<5fH')
+
+
+class DetectionRecorder:
+    """Append-only writer for one source's detection stream"""
+
+    def __init__(self, path, source_id, class_names, profile=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.class_names = [class_names[i] for i in sorted(class_names)]
+        self.class_index = {name: i for i, name in enumerate(self.class_names)}
+        self.frames = 0
+
+        metadata = json.dumps({
+            'source_id': source_id,
+            'class_names': self.class_names,
+            'profile': profile.to_dict() if profile is not None else None,
+            'created_at': time.time(),
+        }).encode('utf-8')
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(metadata)))
+        self.file.write(metadata)
+
+    def write(self, timestamp, detections, frame_shape):
+        """Append one analyzed frame"""
+        known = [d for d in detections if d['class'] in self.class_index]
+        chunks = [RECORD.pack(timestamp, frame_shape[0], frame_shape[1], len(known))]
+        for d in known:
+            x1, y1, x2, y2 = d['bbox']
+            chunks.append(DETECTION.pack(x1, y1, x2, y2, d['confidence'],
+                                         self.class_index[d['class']]))
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(b''.join(chunks))
+            self.frames += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_recording(path):
+    """Load a recording; returns (metadata, [(timestamp, frame_shape, detections)])"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, metadata_len = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a detection recording")
+    if version != VERSION:
+        raise ValueError(f"Unsupported recording version {version}")
+    offset = HEADER.size
+    metadata = json.loads(data[offset:offset + metadata_len].decode('utf-8'))
+    offset += metadata_len
+    class_names = metadata['class_names']
+
+    frames = []
+    while offset + RECORD.size <= len(data):
+        timestamp, height, width, count = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        detections = []
+        for x1, y1, x2, y2, conf, cls in DETECTION.iter_unpack(
+                data[offset:offset + count * DETECTION.size]):
+            detections.append({
+                'class': class_names[cls],
+                'confidence': conf,
+                'bbox': [x1, y1, x2, y2]
+            })
+        offset += count * DETECTION.size
+        frames.append((timestamp, (height, width), detections))
+    return metadata, frames
+
+
+def make_replay_detector():
+    """Build a MedicalEventDetector whose external calls are stubbed"""
+    from medical_detection import MedicalEventDetector
+
+    class ReplayDetector(MedicalEventDetector):
+        def __init__(self):
+            self.emitted = []
+            self.alerts = []
+            super().__init__(emit=self.record_emit)
+
+        def record_emit(self, event, payload):
+            # Copy, like a real Socket.IO emit serializes, so later in-place
+            # updates to history entries don't rewrite what was emitted
+            self.emitted.append((event, copy.deepcopy(payload)))
+
+        def get_groq_reasoning(self, medical_events, detections, source_id):
+            types = sorted({e.get('type', 'general') for e in medical_events})
+            return f"[replay] {', '.join(types)} reasoning for {source_id}"
+
+        def trigger_voice_alert(self, event_summary):
+            self.alerts.append({
+                'source_id': event_summary.get('source_id'),
+                'incident_id': event_summary.get('incident_id'),
+                'risk_level': event_summary['risk_level']
+            })
+
+    return ReplayDetector()
+
+
+def replay(path, speed=0.0, profile=None):
+    """Drive the post-inference path from a recording.
+
+    `speed` scales recorded time (2.0 plays twice as fast); 0 replays as
+    fast as possible. `profile` overrides the recorded profile. Returns the
+    stub detector so callers can inspect `emitted` and `alerts`.
+    """
+    metadata, frames = read_recording(path)
+    source_id = metadata['source_id']
+    class_names = dict(enumerate(metadata['class_names']))
+
+    if profile is None and metadata.get('profile'):
+        from profiles import PROFILES
+        profile = dict(metadata['profile'])
+        base = profile.pop('name')
+        if base in PROFILES:
+            profile['profile'] = base
+
+    detector = make_replay_detector()
+    if detector.register_source(source_id, profile, class_names) is None:
+        raise ValueError(f"Could not compile profile for {source_id}")
+
+    previous = None
+    for timestamp, frame_shape, detections in frames:
+        if speed > 0 and previous is not None:
+            time.sleep(max(0.0, (timestamp - previous) / speed))
+        previous = timestamp
+        detector.process_detections(source_id, frame_shape, detections, timestamp)
+    return detector, len(frames)
+
+
+def summarize(detector):
+    """Reduce a replay to the transitions worth regression-testing"""
+    transitions = []
+    for event, payload in detector.emitted:
+        if event in ('medical_event', 'incident_update', 'incident_closed'):
+            transitions.append({
+                'event': event,
+                'timestamp': payload['timestamp'],
+                'incident_id': payload.get('incident_id'),
+                'risk_level': payload.get('risk_level'),
+            })
+    return {'transitions': transitions, 'alerts': detector.alerts}
+
+
+def parse_profile(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a detection recording')
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='playback speed multiplier (0 = as fast as possible)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='replay this many times and report throughput')
+    parser.add_argument('--profile', type=parse_profile, default=None,
+                        help='profile name or JSON overrides to replay with')
+    parser.add_argument('--output', help='write the event summary to this file')
+    parser.add_argument('--expect', help='compare the event summary with this file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total_frames = 0
+    for _ in range(max(1, args.repeat)):
+        detector, frames = replay(args.recording, args.speed, args.profile)
+        total_frames += frames
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(detector)
+    print(f"Replayed {total_frames} frames in {elapsed:.3f}s "
+          f"({total_frames / elapsed if elapsed else 0:.0f} frames/s)")
+    print(f"Transitions: {len(summary['transitions'])}, alerts: {len(summary['alerts'])}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if args.expect:
+        with open(args.expect) as f:
+            expected = json.load(f)
+        if expected != summary:
+            print(f"Mismatch against {args.expect}")
+            return 1
+        print(f"Matches {args.expect}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
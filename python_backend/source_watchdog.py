@@ -0,0 +1,223 @@
+import threading
+import time
+
+import psutil
+
+import config
+
+# Shedding levels, applied cumulatively. Sources with an open high or
+# critical incident are never shed, and voice alerts are never skipped.
+SHED_NONE = 0
+SHED_LOW_RISK_CADENCE = 1    # analyze low-risk sources less often
+SHED_MEDIUM_REASONING = 2    # also skip Groq reasoning for medium-risk incidents
+SHED_LEVEL_NAMES = {
+    SHED_NONE: 'none',
+    SHED_LOW_RISK_CADENCE: 'reduce_low_risk_cadence',
+    SHED_MEDIUM_REASONING: 'skip_medium_risk_reasoning',
+}
+PROTECTED_RISK_LEVELS = ('high', 'critical')
+
+
+class Watchdog:
+    """Tracks source loop liveness and lag, restarts dead loops and sheds load.
+
+    Source loops report through `loop_started`, `heartbeat`,
+    `expect_analysis`, `analysis_started`, `analysis_done` and
+    `analysis_failed`; `tick` (run every WATCHDOG_INTERVAL seconds once
+    `start` is called) checks them against the configured SLOs.
+    """
+
+    def __init__(self, detector):
+        self.detector = detector
+        # Reentrant: restarts run under it and call back into loop_started
+        self.lock = threading.RLock()
+        self.sources = {}
+        self.shed_level = SHED_NONE
+        self.healthy_ticks = 0
+        self.decisions = []
+        self.thread = None
+
+    # Reports from source loops
+
+    def loop_started(self, source_id):
+        now = time.time()
+        with self.lock:
+            stats = self.sources.setdefault(source_id, {
+                'restarts': 0,
+                'analysis_errors': 0,
+                'next_restart': 0.0,
+            })
+            stats.update({
+                'started': now,
+                'analysis_started': None,
+                'last_heartbeat': now,
+                'last_analysis': now,
+                'expected_period': 0.0,
+                'analysis_duration': 0.0,
+            })
+
+    def remove(self, source_id):
+        with self.lock:
+            self.sources.pop(source_id, None)
+
+    def heartbeat(self, source_id):
+        stats = self.sources.get(source_id)
+        if stats is not None:
+            stats['last_heartbeat'] = time.time()
+
+    def analysis_started(self, source_id):
+        stats = self.sources.get(source_id)
+        if stats is not None:
+            stats['analysis_started'] = time.time()
+
+    def expect_analysis(self, source_id, expected_period):
+        """Seconds the loop expects between analyses at its pace and cadence"""
+        stats = self.sources.get(source_id)
+        if stats is not None:
+            stats['expected_period'] = expected_period
+
+    def analysis_done(self, source_id, duration):
+        stats = self.sources.get(source_id)
+        if stats is not None:
+            stats['analysis_started'] = None
+            stats['last_analysis'] = time.time()
+            stats['analysis_duration'] = duration
+
+    def analysis_failed(self, source_id):
+        stats = self.sources.get(source_id)
+        if stats is not None:
+            stats['analysis_errors'] += 1
+
+    # Shedding policy, consulted by the detector
+
+    def cadence_factor(self, source_id):
+        """Multiplier applied to a source's analysis interval"""
+        if self.shed_level < SHED_LOW_RISK_CADENCE:
+            return 1
+        if self.detector.current_risk_level(source_id) != 'low':
+            return 1
+        return config.SHED_CADENCE_FACTOR
+
+    def skip_reasoning(self, risk_level):
+        """Whether Groq reasoning should be skipped for this risk level"""
+        return self.shed_level >= SHED_MEDIUM_REASONING and risk_level == 'medium'
+
+    # Supervision
+
+    def stale(self, stats, now):
+        """Whether a live loop has stopped making progress"""
+        # Blocking Groq/VAPI calls inside an analysis are not a hang
+        if stats['analysis_started'] is not None:
+            return now - stats['analysis_started'] > config.ANALYSIS_TIMEOUT
+        return now - stats['last_heartbeat'] > config.WATCHDOG_HEARTBEAT_TIMEOUT
+
+    def lag(self, stats, now):
+        # How far past its next analysis deadline a source is; the period
+        # already includes shedding and slow decode, so neither counts as lag
+        return max(0.0, now - stats['last_analysis'] - stats['expected_period'])
+
+    def tick(self):
+        """Check every source once; restart dead loops and adjust shedding"""
+        now = time.time()
+        lagging = 0
+        with self.lock:
+            items = list(self.sources.items())
+
+        for source_id, stats in items:
+            thread = self.detector.detection_threads.get(source_id)
+            alive = thread is not None and thread.is_alive()
+            stale = self.stale(stats, now)
+            if not alive or stale:
+                # Under the lock so remove_video_source (which unregisters
+                # first) can't interleave with the restart
+                with self.lock:
+                    removed = (self.sources.get(source_id) is not stats or
+                               source_id not in self.detector.video_sources)
+                    if not removed and now >= stats['next_restart']:
+                        stats['restarts'] += 1
+                        # Back off exponentially so a broken capture doesn't spin
+                        backoff = min(60.0, 2.0 ** min(stats['restarts'], 6))
+                        stats['next_restart'] = now + backoff
+                        reason = 'thread exited' if not alive else 'heartbeat timeout'
+                        self.record_decision(f"restart {source_id} ({reason})")
+                        self.detector.start_source_loop(source_id)
+                continue
+            if stats['restarts'] and now - stats['started'] > config.WATCHDOG_HEALTHY_SECONDS:
+                # Healthy again; the next failure starts from the shortest backoff
+                stats['restarts'] = 0
+                stats['next_restart'] = 0.0
+            if self.lag(stats, now) > config.ANALYSIS_LAG_SLO:
+                lagging += 1
+
+        cpu = psutil.cpu_percent(interval=None)
+        overloaded = bool(items) and (
+            lagging / float(len(items)) >= config.SHED_LAGGING_FRACTION
+            or cpu >= config.SHED_CPU_PERCENT)
+        self.adjust_shedding(overloaded, lagging, cpu)
+
+    def adjust_shedding(self, overloaded, lagging, cpu):
+        """Step one level up while overloaded, one level down after a calm spell"""
+        if overloaded:
+            self.healthy_ticks = 0
+            if self.shed_level < SHED_MEDIUM_REASONING:
+                self.shed_level += 1
+                self.record_decision(
+                    f"shed -> {SHED_LEVEL_NAMES[self.shed_level]} "
+                    f"({lagging} sources over lag SLO, cpu {cpu:.0f}%)")
+        elif self.shed_level > SHED_NONE:
+            self.healthy_ticks += 1
+            if self.healthy_ticks >= config.SHED_RECOVERY_TICKS:
+                self.healthy_ticks = 0
+                self.shed_level -= 1
+                self.record_decision(f"recover -> {SHED_LEVEL_NAMES[self.shed_level]}")
+
+    def record_decision(self, message):
+        print(f"Watchdog: {message}")
+        self.decisions.append({'timestamp': time.time(), 'decision': message})
+        if len(self.decisions) > 20:  # Keep last 20 decisions
+            self.decisions.pop(0)
+
+    def run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Watchdog error: {e}")
+            time.sleep(config.WATCHDOG_INTERVAL)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def status(self):
+        """Snapshot for the health endpoint"""
+        now = time.time()
+        sources = {}
+        for source_id, stats in list(self.sources.items()):
+            thread = self.detector.detection_threads.get(source_id)
+            sources[source_id] = {
+                'alive': thread is not None and thread.is_alive(),
+                'heartbeat_age': now - stats['last_heartbeat'],
+                'analysis_lag': self.lag(stats, now),
+                'analysis_duration': stats['analysis_duration'],
+                'analysis_errors': stats['analysis_errors'],
+                'in_analysis': stats['analysis_started'] is not None,
+                'restarts': stats['restarts'],
+                'cadence_factor': self.cadence_factor(source_id),
+            }
+        return {
+            'running': self.thread is not None,
+            'slo': {
+                'heartbeat_timeout': config.WATCHDOG_HEARTBEAT_TIMEOUT,
+                'analysis_timeout': config.ANALYSIS_TIMEOUT,
+                'analysis_lag': config.ANALYSIS_LAG_SLO,
+            },
+            'shedding': {
+                'level': self.shed_level,
+                'policy': SHED_LEVEL_NAMES[self.shed_level],
+                'recent_decisions': list(self.decisions),
+            },
+            'sources': sources,
+        }